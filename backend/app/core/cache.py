@@ -0,0 +1,111 @@
+import json
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Optional
+from app.core.config import settings
+
+class TTLCache:
+    """Bounded in-process LRU cache whose entries expire after a TTL."""
+
+    def __init__(self, max_entries: int, ttl: Optional[float] = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: Any) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Any) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+class CacheBackend:
+    """Async key/value store for JSON-serializable values."""
+
+    async def get(self, key: str) -> Optional[Any]:
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+class MemoryCacheBackend(CacheBackend):
+    """Per-process backend; invalidations are not shared between workers."""
+
+    def __init__(self, max_entries: int):
+        self._cache = TTLCache(max_entries=max_entries)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        self._cache.set(key, value, ttl)
+
+    async def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+class RedisCacheBackend(CacheBackend):
+    """Backend shared by all workers through Redis."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}:{key}"
+
+    async def get(self, key: str) -> Optional[Any]:
+        raw = await get_redis().get(self._key(key))
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: int) -> None:
+        await get_redis().set(self._key(key), json.dumps(value), ex=ttl)
+
+    async def delete(self, key: str) -> None:
+        await get_redis().delete(self._key(key))
+
+_redis_client = None
+
+def get_redis():
+    """Shared Redis client, created on first use."""
+    global _redis_client
+    if _redis_client is None:
+        import redis.asyncio as redis
+        _redis_client = redis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+def create_cache_backend(prefix: str, max_entries: int) -> CacheBackend:
+    """Build the cache backend selected by ``CACHE_BACKEND``."""
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(prefix)
+    if settings.CACHE_BACKEND == "memory":
+        return MemoryCacheBackend(max_entries)
+    raise ValueError(f"Unknown cache backend: {settings.CACHE_BACKEND}")
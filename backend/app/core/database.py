@@ -1,17 +1,129 @@
-from sqlalchemy import create_engine
+import time
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.core.config import settings
+from app.core.metrics import DB_QUERY_LATENCY
 
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+class PoolWaitStats:
+    """Running totals of how long callers waited for a pooled connection."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited: float, timed_out: bool = False) -> None:
+        self.checkouts += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if timed_out:
+            self.timeouts += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3)
+        }
+
+pool_wait_stats = PoolWaitStats()
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that times every checkout, including waits for a free slot."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            pool_wait_stats.record(time.perf_counter() - start, timed_out)
+
+def _async_engine_options(url: str) -> dict:
+    """Pool configuration for the async engine (SQLite keeps its default pool)."""
+    if url.startswith("sqlite"):
+        return {}
+    return {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING
+    }
+
+# Sync engine is only used for DDL and maintenance scripts
+engine = create_engine(settings.DATABASE_URL, pool_pre_ping=settings.DB_POOL_PRE_PING)
+
+async_engine = create_async_engine(
+    settings.async_database_url,
+    **_async_engine_options(settings.async_database_url)
+)
+
+# The start time lives on the per-statement execution context, so a statement
+# that fails (and never reaches after_cursor_execute) leaves nothing behind
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context._query_start = time.perf_counter()
+
+@event.listens_for(async_engine.sync_engine, "after_cursor_execute")
+def _record_query_time(conn, cursor, statement, parameters, context, executemany):
+    start = getattr(context, "_query_start", None)
+    if start is None:
+        return
+    elapsed = time.perf_counter() - start
+    operation = statement.lstrip().split(None, 1)[0].lower() if statement.strip() else "other"
+    if operation not in ("select", "insert", "update", "delete"):
+        operation = "other"
+    DB_QUERY_LATENCY.labels(operation).observe(elapsed)
+
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine,
+    class_=AsyncSession,
+    autoflush=False,
+    expire_on_commit=False
+)
 
 Base = declarative_base()
 
-def get_db():
+async def get_db():
     """Database dependency."""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
\ No newline at end of file
+
+async def check_database() -> float:
+    """Run a trivial query and return its round-trip time in milliseconds."""
+    start = time.perf_counter()
+    async with async_engine.connect() as conn:
+        await conn.execute(text("SELECT 1"))
+    return round((time.perf_counter() - start) * 1000, 3)
+
+def get_pool_status() -> dict:
+    """Snapshot of the async engine's connection pool."""
+    pool = async_engine.pool
+    status = {"pool_class": type(pool).__name__}
+    
+    if isinstance(pool, AsyncAdaptedQueuePool):
+        status.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": settings.DB_MAX_OVERFLOW,
+            "timeout_seconds": settings.DB_POOL_TIMEOUT,
+            "recycle_seconds": settings.DB_POOL_RECYCLE,
+            "pre_ping": settings.DB_POOL_PRE_PING
+        })
+    else:
+        status["status"] = pool.status()
+    
+    status["waits"] = pool_wait_stats.as_dict()
+    return status
@@ -0,0 +1,92 @@
+import asyncio
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from typing import Callable, Optional, TypeVar
+from fastapi import HTTPException, status
+
+T = TypeVar("T")
+
+class BoundedExecutor:
+    """Worker pool with a bounded backlog for blocking/CPU-bound calls.
+
+    Calls beyond ``max_workers`` running plus ``max_queue`` waiting are
+    rejected with a 503 and a Retry-After header instead of piling up.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_workers: int,
+        max_queue: int,
+        kind: str = "thread",
+        retry_after: int = 1
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unknown executor kind: {kind}")
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self.retry_after = retry_after
+        self._executor: Optional[Executor] = None
+        self._in_flight = 0
+        self._lock = threading.Lock()  # Slots are released from worker threads
+
+    @property
+    def in_flight(self) -> int:
+        """Number of calls currently running or waiting for a worker."""
+        return self._in_flight
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers,
+                    thread_name_prefix=self.name
+                )
+        return self._executor
+
+    def check_capacity(self) -> None:
+        """Raise 503 with Retry-After if the pool cannot accept another call."""
+        if self._in_flight >= self.capacity:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": str(self.retry_after)}
+            )
+
+    def _release(self, _future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, func: Callable[..., T], *args, **kwargs) -> T:
+        """Run ``func`` in the pool, failing fast when the backlog is full.
+
+        The slot is held until the job itself finishes, not the awaiting
+        coroutine, so callers that are cancelled (client disconnects,
+        timeouts) cannot hide work still queued or running in the pool.
+        """
+        with self._lock:
+            self.check_capacity()
+            self._in_flight += 1
+        try:
+            future = self._get_executor().submit(partial(func, *args, **kwargs))
+        except BaseException:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        # Cancelling the wrapper also cancels the job if it has not started yet
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Shut down the underlying pool; it is recreated on next use."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
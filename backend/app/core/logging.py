@@ -0,0 +1,175 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+from app.core.config import settings
+from app.core.metrics import LOG_RECORDS_DROPPED
+
+# Set per request by RequestIdMiddleware and stamped onto every record logged in it
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has; anything else came in through ``extra=``
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id"}
+
+def _extra_fields(record: logging.LogRecord) -> dict:
+    return {
+        key: value for key, value in vars(record).items()
+        if key not in _RECORD_ATTRS and not key.startswith("_")
+    }
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with ``extra=`` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            entry["request_id"] = record.request_id
+        entry.update(_extra_fields(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development, with extras appended as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s [%(name)s] %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = _extra_fields(record)
+        if getattr(record, "request_id", None):
+            fields = {"request_id": record.request_id, **fields}
+        if fields:
+            first, _, rest = line.partition("\n")
+            line = first + " " + " ".join(f"{key}={value!r}" for key, value in fields.items())
+            if rest:
+                line += "\n" + rest
+        return line
+
+class RequestIdFilter(logging.Filter):
+    """Copy the current request id onto the record while still on the caller's task."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records at or below ``max_level``; louder ones always pass."""
+
+    def __init__(self, rate: float, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > self.max_level or self.rate >= 1:
+            return True
+        return random.random() < self.rate
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread without ever blocking the caller.
+
+    The last ``reserved`` queue slots are kept for WARNING and above, so a
+    flood of info/debug records cannot crowd out errors. Records that do not
+    fit are dropped, counted in ``log_records_dropped_total`` and reported by
+    a warning once the queue has room again.
+    """
+
+    def __init__(self, log_queue: queue.Queue, reserved: int = 0):
+        super().__init__(log_queue)
+        self.reserved = reserved
+        self.dropped = 0
+        self._unreported = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve args/tracebacks now, but leave formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            if record.levelno < logging.WARNING and self.queue.qsize() >= self.queue.maxsize - self.reserved:
+                raise queue.Full
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            self._unreported += 1
+            LOG_RECORDS_DROPPED.labels(record.levelname.lower()).inc()
+            return
+
+        if self._unreported:
+            self._report_dropped()
+
+    def _report_dropped(self) -> None:
+        notice = logging.LogRecord(
+            "app.core.logging", logging.WARNING, __file__, 0,
+            "Log queue was full; records were dropped", None, None
+        )
+        notice.dropped = self._unreported
+        notice.request_id = None
+        try:
+            self.queue.put_nowait(notice)
+        except queue.Full:
+            return
+        self._unreported = 0
+
+_listener: Optional[QueueListener] = None
+
+def setup_logging() -> None:
+    """Route all logging through a queue to a stdout writer thread (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    if settings.LOG_FORMAT == "json":
+        stream_handler.setFormatter(JsonFormatter())
+    else:
+        stream_handler.setFormatter(TextFormatter())
+
+    reserved = settings.LOG_QUEUE_RESERVED_SIZE
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE + reserved)
+    queue_handler = NonBlockingQueueHandler(log_queue, reserved=reserved)
+    queue_handler.addFilter(RequestIdFilter())
+    queue_handler.addFilter(SamplingFilter(settings.LOG_DEBUG_SAMPLE_RATE))
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    # Send uvicorn's own loggers through the same pipeline
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = QueueListener(log_queue, stream_handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,75 @@
+import os
+import time
+from contextlib import contextmanager
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+)
+
+# Request-level metrics (recorded by MetricsMiddleware)
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+    multiprocess_mode="livesum"
+)
+REQUESTS_TOTAL = Counter(
+    "http_requests_total",
+    "HTTP responses by route template and status code",
+    ["method", "route", "status"]
+)
+
+# Stage timers: where a request spends its time
+PASSWORD_HASH_LATENCY = Histogram(
+    "password_hash_duration_seconds",
+    "bcrypt hash/verify latency, including wait for a hashing worker",
+    ["operation"],
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5)
+)
+DB_QUERY_LATENCY = Histogram(
+    "db_query_duration_seconds",
+    "Database statement execution latency",
+    ["operation"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+SMTP_SEND_LATENCY = Histogram(
+    "smtp_send_duration_seconds",
+    "SMTP delivery latency by transport and outcome",
+    ["transport", "outcome"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+IMAGE_PROCESSING_LATENCY = Histogram(
+    "avatar_processing_duration_seconds",
+    "Pillow avatar processing latency, including wait for an image worker",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+)
+
+# Logging pipeline health (recorded by NonBlockingQueueHandler)
+LOG_RECORDS_DROPPED = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+    ["level"]
+)
+
+@contextmanager
+def observe(histogram: Histogram, **labels):
+    """Time the block into ``histogram`` (with ``labels``), even if it raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        target = histogram.labels(**labels) if labels else histogram
+        target.observe(time.perf_counter() - start)
+
+def render_metrics():
+    """Prometheus exposition for this process, or for all workers in multiprocess mode."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
@@ -0,0 +1,73 @@
+import time
+import uuid
+from typing import Optional
+from app.core.cache import TTLCache, get_redis
+from app.core.config import settings
+
+class RateLimiter:
+    """Counts hits per key; ``hit`` returns 0 when allowed, else seconds until retry."""
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        raise NotImplementedError
+
+class MemoryRateLimiter(RateLimiter):
+    """Per-process token buckets: ``limit`` tokens refilled evenly over ``window``."""
+
+    def __init__(self, max_keys: int = 100_000):
+        self._buckets = TTLCache(max_entries=max_keys)
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        now = time.monotonic()
+        rate = limit / window
+        tokens, updated = self._buckets.get(key) or (float(limit), now)
+        tokens = min(float(limit), tokens + (now - updated) * rate)
+
+        if tokens < 1:
+            self._buckets.set(key, (tokens, now), window)
+            return (1 - tokens) / rate
+
+        # A full bucket is the same as no entry, so it can expire after one window
+        self._buckets.set(key, (tokens - 1, now), window)
+        return 0.0
+
+# Sliding-window log: drop hits older than the window, admit if under the limit,
+# otherwise report when the oldest hit leaves the window (all in milliseconds)
+_SLIDING_WINDOW_SCRIPT = """
+local now = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local limit = tonumber(ARGV[3])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+if redis.call('ZCARD', KEYS[1]) < limit then
+    redis.call('ZADD', KEYS[1], now, ARGV[4])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return 0
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return tonumber(oldest[2]) + window - now
+"""
+
+class RedisRateLimiter(RateLimiter):
+    """Sliding-window limits shared by every worker through Redis."""
+
+    def __init__(self, prefix: str = "ratelimit"):
+        self.prefix = prefix
+        self._script = None
+
+    async def hit(self, key: str, limit: int, window: float) -> float:
+        if self._script is None:
+            self._script = get_redis().register_script(_SLIDING_WINDOW_SCRIPT)
+        now_ms = int(time.time() * 1000)
+        retry_ms = await self._script(
+            keys=[f"{self.prefix}:{key}"],
+            args=[now_ms, int(window * 1000), limit, f"{now_ms}-{uuid.uuid4().hex[:8]}"]
+        )
+        return max(int(retry_ms), 0) / 1000
+
+def create_rate_limiter(backend: Optional[str] = None) -> RateLimiter:
+    """Build the limiter selected by ``RATE_LIMIT_BACKEND``."""
+    backend = backend or settings.RATE_LIMIT_BACKEND
+    if backend == "redis":
+        return RedisRateLimiter()
+    if backend == "memory":
+        return MemoryRateLimiter()
+    raise ValueError(f"Unknown rate limit backend: {backend}")
@@ -0,0 +1,87 @@
+from typing import Dict, Tuple
+from fastapi import HTTPException, status
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+
+# Room for multipart boundaries and part headers around an uploaded file
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Per-route body caps for (method, path); everything else gets MAX_REQUEST_BODY_BYTES
+ROUTE_BODY_LIMITS: Dict[Tuple[str, str], int] = {
+    ("POST", "/api/users/upload-avatar"): settings.AVATAR_MAX_FILE_SIZE + MULTIPART_OVERHEAD,
+}
+
+class BodySizeLimitMiddleware:
+    """Rejects oversized request bodies with 413 before they are buffered.
+
+    Declared Content-Length is checked up front; chunked or understated
+    bodies are counted as ``receive()`` hands them to the app, so form
+    parsing never spools more than the cap.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    def _limit(self, scope: Scope) -> int:
+        return ROUTE_BODY_LIMITS.get((scope["method"], scope["path"]), settings.MAX_REQUEST_BODY_BYTES)
+
+    def _too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail="Request body too large"
+        )
+
+    async def _reject(self, send: Send) -> None:
+        body = b'{"detail":"Request body too large"}'
+        await send({
+            "type": "http.response.start",
+            "status": status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"connection", b"close"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = self._limit(scope)
+        content_length = dict(scope["headers"]).get(b"content-length")
+        if content_length is not None:
+            try:
+                declared = int(content_length)
+            except ValueError:
+                declared = 0
+            if declared > limit:
+                await self._reject(send)
+                return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    # FastAPI re-raises HTTPException from body parsing, so this becomes a 413
+                    raise self._too_large()
+            return message
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, send_wrapper)
+        except HTTPException as e:
+            if e.status_code != status.HTTP_413_REQUEST_ENTITY_TOO_LARGE or response_started:
+                raise
+            await self._reject(send)
@@ -0,0 +1,56 @@
+import time
+from typing import Optional
+from starlette.routing import Match, Router
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT, REQUESTS_TOTAL
+
+class MetricsMiddleware:
+    """Records latency, in-flight count and status per route template.
+
+    Labels use the route's path template (``/api/users/{user_id}/avatar``)
+    so metric cardinality stays bounded.
+    """
+
+    def __init__(self, app: ASGIApp, router: Optional[Router] = None):
+        self.app = app
+        self.router = router
+
+    def _route_template(self, scope: Scope, request_scope: Scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+
+        # Mounts and requests rejected before routing (e.g. 429s) carry no route
+        if self.router is not None:
+            for candidate in self.router.routes:
+                match, _ = candidate.matches(request_scope)
+                if match == Match.FULL:
+                    return getattr(candidate, "path", "unmatched")
+        return "unmatched"
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Routing rewrites path/root_path for mounts, so keep the original for matching
+        request_scope = dict(scope)
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+
+            route = self._route_template(scope, request_scope)
+            REQUEST_LATENCY.labels(scope["method"], route).observe(elapsed)
+            REQUESTS_TOTAL.labels(scope["method"], route, str(status_code)).inc()
@@ -0,0 +1,165 @@
+import hashlib
+import ipaddress
+import json
+import logging
+import math
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+from app.core.config import settings
+from app.core.rate_limit import RateLimiter, create_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+class RateLimitRule(NamedTuple):
+    identity: str  # 'ip' or a JSON body field such as 'username' / 'email'
+    limit: int
+    window: int  # seconds
+
+# Per-route limits for (method, path); body-keyed rules throttle one account or address
+ROUTE_RULES: Dict[Tuple[str, str], List[RateLimitRule]] = {
+    ("POST", "/api/auth/login"): [
+        RateLimitRule("ip", 20, 60),
+        RateLimitRule("username", 5, 60),
+    ],
+    ("POST", "/api/auth/register"): [
+        RateLimitRule("ip", 10, 3600),
+        RateLimitRule("email", 3, 3600),
+    ],
+    ("POST", "/api/auth/verify-email"): [
+        RateLimitRule("ip", 30, 600),
+        RateLimitRule("email", 10, 900),
+    ],
+    ("POST", "/api/auth/forgot-password"): [
+        RateLimitRule("ip", 10, 600),
+        RateLimitRule("email", 3, 900),
+    ],
+    ("POST", "/api/auth/reset-password"): [
+        RateLimitRule("ip", 30, 600),
+        RateLimitRule("email", 10, 900),
+    ],
+    ("POST", "/api/auth/resend-verification"): [
+        RateLimitRule("ip", 10, 600),
+        RateLimitRule("email", 3, 900),
+    ],
+}
+
+# Applied to every other /api request
+DEFAULT_RULES = [RateLimitRule("ip", 600, 60)]
+
+# Auth payloads are tiny; larger bodies are not parsed for identities
+MAX_INSPECTED_BODY = 16 * 1024
+
+class RateLimitMiddleware:
+    """Rejects over-limit requests with 429 before they reach the routers.
+
+    Pure ASGI so the JSON body can be read for identity keys and then
+    replayed to the endpoint untouched.
+    """
+
+    def __init__(self, app: ASGIApp, limiter: Optional[RateLimiter] = None):
+        self.app = app
+        self.limiter = limiter or create_rate_limiter()
+        self.trust_proxy = settings.RATE_LIMIT_TRUST_PROXY
+        self.trusted_proxies = [
+            ipaddress.ip_network(entry.strip(), strict=False)
+            for entry in settings.RATE_LIMIT_TRUSTED_PROXIES.split(",") if entry.strip()
+        ]
+
+    def _from_trusted_proxy(self, peer: Optional[str]) -> bool:
+        try:
+            address = ipaddress.ip_address(peer)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
+
+    def _client_ip(self, scope: Scope) -> str:
+        client = scope.get("client")
+        peer = client[0] if client else None
+        # Forwarding headers are only honoured from the proxy itself; anyone else could spoof them
+        if self.trust_proxy and self._from_trusted_proxy(peer):
+            headers = dict(scope["headers"])
+            real_ip = headers.get(b"x-real-ip")
+            if real_ip:
+                return real_ip.decode("latin-1").strip()
+            forwarded = headers.get(b"x-forwarded-for")
+            if forwarded:
+                return forwarded.decode("latin-1").split(",")[0].strip()
+        return peer or "unknown"
+
+    async def _read_body(self, receive: Receive) -> Tuple[bytes, List[Message]]:
+        """Read up to MAX_INSPECTED_BODY bytes, keeping the messages for replay."""
+        messages: List[Message] = []
+        body = b""
+        while True:
+            message = await receive()
+            messages.append(message)
+            if message["type"] != "http.request":
+                break
+            body += message.get("body", b"")
+            if not message.get("more_body", False) or len(body) > MAX_INSPECTED_BODY:
+                break
+        return body, messages
+
+    def _identity(self, rule: RateLimitRule, ip: str, payload: dict) -> Optional[str]:
+        if rule.identity == "ip":
+            return ip
+        value = payload.get(rule.identity)
+        if not isinstance(value, str) or not value.strip():
+            return None
+        # Keep addresses and usernames out of the limiter store
+        return hashlib.sha256(value.strip().lower().encode()).hexdigest()[:32]
+
+    async def _too_many_requests(self, send: Send, retry_after: float) -> None:
+        body = json.dumps({"detail": "Too many requests, please try again later"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith("/api/"):
+            await self.app(scope, receive, send)
+            return
+
+        rules = ROUTE_RULES.get((scope["method"], scope["path"]), DEFAULT_RULES)
+
+        payload: dict = {}
+        if any(rule.identity != "ip" for rule in rules):
+            body, messages = await self._read_body(receive)
+            try:
+                parsed = json.loads(body) if len(body) <= MAX_INSPECTED_BODY else None
+                payload = parsed if isinstance(parsed, dict) else {}
+            except ValueError:
+                pass
+
+            # Replay what was read, then hand over to the real receive
+            original_receive = receive
+
+            async def receive() -> Message:
+                if messages:
+                    return messages.pop(0)
+                return await original_receive()
+
+        ip = self._client_ip(scope)
+        for rule in rules:
+            identity = self._identity(rule, ip, payload)
+            if identity is None:
+                continue
+            key = f"{rule.identity}:{scope['method']}:{scope['path']}:{identity}"
+            try:
+                retry_after = await self.limiter.hit(key, rule.limit, rule.window)
+            except Exception as e:
+                # Fail open: an unavailable limiter store must not take the API down
+                logger.warning("Rate limiter unavailable, allowing request", extra={"error": str(e)})
+                break
+            if retry_after > 0:
+                await self._too_many_requests(send, retry_after)
+                return
+
+        await self.app(scope, receive, send)
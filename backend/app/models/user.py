@@ -1,6 +1,7 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text, Enum, Index, JSON, DDL, event
 from sqlalchemy.sql import func
 from app.core.database import Base
+from datetime import datetime
 import enum
 
 class UserRole(enum.Enum):
@@ -27,6 +28,7 @@ class User(Base):
     phone = Column(String(20), nullable=True)
     location = Column(String(100), nullable=True)
     avatar_url = Column(String(255), nullable=True)
+    avatar_variants = Column(JSON, nullable=True)  # {size: {format: url}}
     
     # Role and permissions
     role = Column(String(20), default="user", nullable=False)
@@ -34,13 +36,70 @@ class User(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+    # Keyset pagination for the admin listing: (created_at, id), optionally behind a filter
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+        Index("ix_users_role_created_at_id", "role", "created_at", "id"),
+        Index("ix_users_is_active_created_at_id", "is_active", "created_at", "id"),
+        Index("ix_users_is_verified_created_at_id", "is_verified", "created_at", "id"),
+        # Trigram indexes for admin search (Postgres only; see pg_trgm listener below)
+        *(
+            Index(
+                f"ix_users_{column}_trgm",
+                column,
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"}
+            ).ddl_if(dialect="postgresql")
+            for column in ("username", "email", "first_name", "last_name")
+        ),
+    )
+
+# The trigram indexes need the extension before the tables are created
+event.listen(
+    Base.metadata,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
 class OTPCode(Base):
     __tablename__ = "otp_codes"
 
     id = Column(Integer, primary_key=True, index=True)
     email = Column(String(100), index=True, nullable=False)
-    code = Column(String(6), nullable=False)
+    code_hash = Column(String(64), nullable=False)  # HMAC-SHA256, see app.utils.otp.hash_otp_code
     purpose = Column(String(20), nullable=False)  # 'registration', 'password_reset'
     expires_at = Column(DateTime, nullable=False)
     is_used = Column(Boolean, default=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_otp_codes_email_purpose_is_used", "email", "purpose", "is_used"),
+        Index("ix_otp_codes_expires_at", "expires_at"),  # Sweeper range scans
+    )
+
+class AvatarBlob(Base):
+    __tablename__ = "avatar_blobs"
+
+    key = Column(String(100), primary_key=True)  # '<sha256 of content>.<ext>'
+    ref_count = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    to_email = Column(String(100), nullable=False)
+    subject = Column(String(255), nullable=False)
+    html_body = Column(Text, nullable=False)
+    text_body = Column(Text, nullable=True)
+    status = Column(String(20), default="pending", nullable=False)  # 'pending', 'sending', 'sent', 'failed'
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    locked_at = Column(DateTime, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_available_at", "status", "available_at"),
+    )
@@ -1,21 +1,22 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
 from app.schemas.user import (
     UserCreate, UserLogin, UserResponse, Token, 
     OTPRequest, OTPVerify, PasswordReset, Message
 )
 from app.services.auth import AuthService
+from app.services.user_cache import user_cache
 from app.utils.auth import create_access_token, verify_token
 from app.models.user import User
 
 router = APIRouter()
 security = HTTPBearer()
 
-def get_current_user(
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ) -> User:
     """Get current authenticated user."""
     token = credentials.credentials
@@ -28,8 +29,12 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    auth_service = AuthService(db)
-    user = auth_service.get_user_by_email(email)
+    user = await user_cache.get(db, email)
+    if user is None:
+        auth_service = AuthService(db)
+        user = await auth_service.get_user_by_email(email)
+        if user is not None:
+            await user_cache.set(user)
     
     if user is None:
         raise HTTPException(
@@ -41,25 +46,25 @@ def get_current_user(
     return user
 
 @router.post("/register", response_model=Message)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)):
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_db)):
     """Register a new user."""
     auth_service = AuthService(db)
     
     # Check if user already exists
-    if auth_service.get_user_by_email(user_data.email):
+    if await auth_service.get_user_by_email(user_data.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    if auth_service.get_user_by_username(user_data.username):
+    if await auth_service.get_user_by_username(user_data.username):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Username already taken"
         )
     
     # Create user
-    user = auth_service.create_user(user_data)
+    user = await auth_service.create_user(user_data)
     
     # Send verification email
     otp_sent = await auth_service.create_otp_code(user.email, "registration")
@@ -73,28 +78,28 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     return {"message": "User registered successfully. Please check your email for verification code."}
 
 @router.post("/verify-email", response_model=Message)
-async def verify_email(otp_data: OTPVerify, db: Session = Depends(get_db)):
+async def verify_email(otp_data: OTPVerify, db: AsyncSession = Depends(get_db)):
     """Verify user email with OTP."""
     auth_service = AuthService(db)
     
     # Verify OTP
-    if not auth_service.verify_otp_code(otp_data.email, otp_data.code, "registration"):
+    if not await auth_service.verify_otp_code(otp_data.email, otp_data.code, "registration"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired verification code"
         )
     
     # Mark user as verified
-    auth_service.verify_user_email(otp_data.email)
+    await auth_service.verify_user_email(otp_data.email)
     
     return {"message": "Email verified successfully"}
 
 @router.post("/login", response_model=Token)
-async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
+async def login(user_credentials: UserLogin, db: AsyncSession = Depends(get_db)):
     """Login user."""
     auth_service = AuthService(db)
     
-    user = auth_service.authenticate_user(user_credentials.username, user_credentials.password)
+    user = await auth_service.authenticate_user(user_credentials.username, user_credentials.password)
     
     if not user:
         raise HTTPException(
@@ -120,11 +125,11 @@ async def login(user_credentials: UserLogin, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/forgot-password", response_model=Message)
-async def forgot_password(request: OTPRequest, db: Session = Depends(get_db)):
+async def forgot_password(request: OTPRequest, db: AsyncSession = Depends(get_db)):
     """Request password reset."""
     auth_service = AuthService(db)
     
-    user = auth_service.get_user_by_email(request.email)
+    user = await auth_service.get_user_by_email(request.email)
     if not user:
         # Don't reveal if email exists or not
         return {"message": "If the email exists, a password reset code has been sent."}
@@ -141,19 +146,19 @@ async def forgot_password(request: OTPRequest, db: Session = Depends(get_db)):
     return {"message": "If the email exists, a password reset code has been sent."}
 
 @router.post("/reset-password", response_model=Message)
-async def reset_password(reset_data: PasswordReset, db: Session = Depends(get_db)):
+async def reset_password(reset_data: PasswordReset, db: AsyncSession = Depends(get_db)):
     """Reset password with OTP."""
     auth_service = AuthService(db)
     
     # Verify OTP
-    if not auth_service.verify_otp_code(reset_data.email, reset_data.code, "password_reset"):
+    if not await auth_service.verify_otp_code(reset_data.email, reset_data.code, "password_reset"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired reset code"
         )
     
     # Reset password
-    auth_service.reset_user_password(reset_data.email, reset_data.new_password)
+    await auth_service.reset_user_password(reset_data.email, reset_data.new_password)
     
     return {"message": "Password reset successfully"}
 
@@ -163,11 +168,11 @@ async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user
 
 @router.post("/resend-verification", response_model=Message)
-async def resend_verification(request: OTPRequest, db: Session = Depends(get_db)):
+async def resend_verification(request: OTPRequest, db: AsyncSession = Depends(get_db)):
     """Resend verification email."""
     auth_service = AuthService(db)
     
-    user = auth_service.get_user_by_email(request.email)
+    user = await auth_service.get_user_by_email(request.email)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
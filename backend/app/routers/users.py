@@ -1,15 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, RedirectResponse, StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, get_db
 from app.schemas.user import (
     UserProfileResponse, UserProfileUpdate, ChangePassword, Message,
-    AdminUserUpdate, UserListResponse
+    AdminUserUpdate, AdminBulkUpdate, BulkUpdateResponse, UserListResponse,
+    UserPage, UserRole, UserSort
 )
 from app.routers.auth import get_current_user
+from app.services.admin_users import AdminUserService, UserFilters
 from app.services.auth import AuthService
-from app.services.file_upload import file_upload_service
+from app.services.file_upload import StoredAvatar, file_upload_service
 from app.utils.permissions import require_admin, require_moderator_or_admin
 from app.models.user import User
 
@@ -24,7 +27,7 @@ async def get_user_profile(current_user: User = Depends(get_current_user)):
 async def update_user_profile(
     profile_data: UserProfileUpdate,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user profile information."""
     auth_service = AuthService(db)
@@ -32,19 +35,19 @@ async def update_user_profile(
     # Convert profile data to dict, excluding None values
     profile_dict = profile_data.dict(exclude_unset=True)
     
-    updated_user = auth_service.update_user_profile(current_user, profile_dict)
+    updated_user = await auth_service.update_user_profile(current_user, profile_dict)
     return updated_user
 
 @router.post("/change-password", response_model=Message)
 async def change_password(
     password_data: ChangePassword,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Change user password."""
     auth_service = AuthService(db)
     
-    success = auth_service.change_user_password(
+    success = await auth_service.change_user_password(
         current_user,
         password_data.current_password,
         password_data.new_password
@@ -58,31 +61,61 @@ async def change_password(
     
     return {"message": "Password changed successfully"}
 
-@router.post("/upload-avatar", response_model=Message)
+async def _apply_processed_avatar(user_id: int, stored: StoredAvatar) -> Optional[StoredAvatar]:
+    """Point the user at a background-processed avatar; returns the avatar to release."""
+    async with AsyncSessionLocal() as db:
+        auth_service = AuthService(db)
+        user = await auth_service.get_user_by_id(user_id)
+        if not user:
+            # Nobody claimed the upload, so it is released straight away
+            return stored
+        
+        old_avatar_url, old_variants = user.avatar_url, user.avatar_variants
+        await auth_service.set_user_avatar(user, stored.url, stored.variants)
+    
+    if not old_avatar_url:
+        return None
+    return StoredAvatar(url=old_avatar_url, variants=old_variants or {})
+
+@router.post("/upload-avatar", response_model=Message, responses={202: {"model": Message}})
 async def upload_avatar(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload user avatar."""
+    if settings.AVATAR_ASYNC_PROCESSING:
+        user_id = current_user.id
+        await file_upload_service.submit_avatar_job(
+            file,
+            lambda stored: _apply_processed_avatar(user_id, stored)
+        )
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content={"message": "Avatar upload accepted and is being processed"}
+        )
+    
     auth_service = AuthService(db)
+    old_avatar_url, old_variants = current_user.avatar_url, current_user.avatar_variants
     
-    # Delete old avatar if exists
-    if current_user.avatar_url:
-        file_upload_service.delete_avatar(current_user.avatar_url)
+    # Save new avatar; the stored blobs come back already referenced
+    stored = await file_upload_service.save_avatar(file, current_user.id)
     
-    # Save new avatar
-    avatar_url = await file_upload_service.save_avatar(file, current_user.id)
+    try:
+        await auth_service.set_user_avatar(current_user, stored.url, stored.variants)
+    except Exception:
+        await file_upload_service.release_avatar(stored.url, stored.variants)
+        raise
     
-    # Update user profile with new avatar URL
-    auth_service.update_user_profile(current_user, {"avatar_url": avatar_url})
+    # Release the old avatar; its files are removed once nothing references them
+    await file_upload_service.release_avatar(old_avatar_url, old_variants)
     
     return {"message": "Avatar uploaded successfully"}
 
 @router.delete("/delete-avatar", response_model=Message)
 async def delete_avatar(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete user avatar."""
     if not current_user.avatar_url:
@@ -92,38 +125,160 @@ async def delete_avatar(
         )
     
     auth_service = AuthService(db)
-    
-    # Delete avatar file
-    file_upload_service.delete_avatar(current_user.avatar_url)
+    old_avatar_url, old_variants = current_user.avatar_url, current_user.avatar_variants
     
     # Update user profile
-    auth_service.update_user_profile(current_user, {"avatar_url": None})
+    await auth_service.set_user_avatar(current_user, None, None)
+    
+    # Release avatar files no other user shares
+    await file_upload_service.release_avatar(old_avatar_url, old_variants)
     
     return {"message": "Avatar deleted successfully"}
 
+@router.get("/{user_id}/avatar")
+async def get_user_avatar(
+    user_id: int,
+    request: Request,
+    size: int = Query(200, ge=1, le=1024),
+    db: AsyncSession = Depends(get_db)
+):
+    """Redirect to the best avatar variant for the requested size and the client's Accept header."""
+    auth_service = AuthService(db)
+    user = await auth_service.get_user_by_id(user_id)
+    if not user or not user.avatar_url:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Avatar not found"
+        )
+    
+    avatar_url = user.avatar_url
+    if user.avatar_variants:
+        avatar_url = file_upload_service.select_variant(
+            user.avatar_variants,
+            size,
+            request.headers.get("accept", "")
+        ) or avatar_url
+    
+    return RedirectResponse(
+        url=await file_upload_service.download_url(avatar_url),
+        status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+        headers={"Vary": "Accept", "Cache-Control": "public, max-age=60"}
+    )
+
 # Admin endpoints
-@router.get("/admin/users", response_model=List[UserListResponse])
+@router.get("/admin/users", response_model=UserPage)
 async def list_all_users(
-    skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(50, ge=1, le=200),
+    cursor: Optional[str] = None,
+    sort: UserSort = UserSort.NEWEST,
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    is_verified: Optional[bool] = None,
+    search: Optional[str] = Query(None, max_length=100),
+    admin_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """List users a page at a time, newest first by default (Admin only).
+
+    Pages are keyset-based: pass ``next_cursor`` back as ``cursor`` with the
+    same sort and filters to continue.
+    """
+    admin_service = AdminUserService(db)
+    filters = UserFilters(
+        role=role.value if role else None,
+        is_active=is_active,
+        is_verified=is_verified,
+        search=search
+    )
+    
+    users, next_cursor = await admin_service.list_users(filters, sort, limit, cursor)
+    total, total_is_estimate = await admin_service.count_users(filters)
+    
+    return UserPage(
+        items=users,
+        next_cursor=next_cursor,
+        total=total,
+        total_is_estimate=total_is_estimate
+    )
+
+@router.get("/admin/users/export")
+async def export_users(
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    role: Optional[UserRole] = None,
+    is_active: Optional[bool] = None,
+    is_verified: Optional[bool] = None,
+    search: Optional[str] = Query(None, max_length=100),
+    admin_user: User = Depends(require_admin)
+):
+    """Stream every matching user as CSV or NDJSON (Admin only)."""
+    filters = UserFilters(
+        role=role.value if role else None,
+        is_active=is_active,
+        is_verified=is_verified,
+        search=search
+    )
+    
+    async def generate():
+        # The export outlives the request handler, so it owns its session
+        async with AsyncSessionLocal() as db:
+            admin_service = AdminUserService(db)
+            rows = admin_service.export_csv(filters) if format == "csv" else admin_service.export_ndjson(filters)
+            async for chunk in rows:
+                yield chunk
+    
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        generate(),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="users.{format}"'}
+    )
+
+@router.get("/admin/search", response_model=List[UserListResponse])
+async def search_users(
+    q: str = Query(..., min_length=3, max_length=100),
+    limit: int = Query(20, ge=1, le=50),
+    admin_user: User = Depends(require_admin),
+    db: AsyncSession = Depends(get_db)
+):
+    """Find users by username, email or name, best matches first (Admin only)."""
+    admin_service = AdminUserService(db)
+    return await admin_service.search_users(q, limit)
+
+@router.post("/admin/users/bulk", response_model=BulkUpdateResponse)
+async def bulk_update_users(
+    bulk_update: AdminBulkUpdate,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """List all users (Admin only)."""
-    users = db.query(User).offset(skip).limit(limit).all()
-    return users
+    """Change role/is_active for many users at once (Admin only)."""
+    admin_service = AdminUserService(db)
+    
+    values = bulk_update.dict(include={"role", "is_active"}, exclude_none=True)
+    if "role" in values:
+        values["role"] = values["role"].value
+    
+    filters = None
+    if bulk_update.filter is not None:
+        filters = UserFilters(
+            role=bulk_update.filter.role.value if bulk_update.filter.role else None,
+            is_active=bulk_update.filter.is_active,
+            is_verified=bulk_update.filter.is_verified,
+            search=bulk_update.filter.search
+        )
+    
+    return await admin_service.bulk_update(admin_user, values, bulk_update.user_ids, filters)
 
 @router.put("/admin/users/{user_id}", response_model=UserListResponse)
 async def update_user_admin(
     user_id: int,
     user_update: AdminUserUpdate,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Update user role/status (Admin only)."""
     auth_service = AuthService(db)
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await auth_service.get_user_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -139,7 +294,7 @@ async def update_user_admin(
     
     # Update user
     update_data = user_update.dict(exclude_unset=True)
-    updated_user = auth_service.update_user_profile(user, update_data)
+    updated_user = await auth_service.update_user_profile(user, update_data)
     
     return updated_user
 
@@ -147,12 +302,12 @@ async def update_user_admin(
 async def deactivate_user(
     user_id: int,
     admin_user: User = Depends(require_admin),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Deactivate user (Admin only)."""
     auth_service = AuthService(db)
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await auth_service.get_user_by_id(user_id)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -167,6 +322,6 @@ async def deactivate_user(
         )
     
     # Deactivate user
-    auth_service.update_user_profile(user, {"is_active": False})
+    await auth_service.update_user_profile(user, {"is_active": False})
     
     return {"message": f"User {user.username} deactivated successfully"}
\ No newline at end of file
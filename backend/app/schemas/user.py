@@ -1,5 +1,5 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import Dict, List, Optional
 from datetime import datetime
 from enum import Enum
 
@@ -65,6 +65,7 @@ class UserProfileResponse(UserProfile):
     is_verified: bool
     role: UserRole
     avatar_url: Optional[str] = None
+    avatar_variants: Optional[Dict[str, Dict[str, str]]] = None
     created_at: datetime
     updated_at: Optional[datetime] = None
     
@@ -75,6 +76,41 @@ class AdminUserUpdate(BaseModel):
     role: Optional[UserRole] = None
     is_active: Optional[bool] = None
 
+class AdminUserFilter(BaseModel):
+    role: Optional[UserRole] = None
+    is_active: Optional[bool] = None
+    is_verified: Optional[bool] = None
+    search: Optional[str] = Field(None, max_length=100)
+
+class AdminBulkUpdate(AdminUserUpdate):
+    """Apply role/is_active to explicit user IDs or to every user matching a filter."""
+    user_ids: Optional[List[int]] = Field(None, min_length=1, max_length=10000)
+    filter: Optional[AdminUserFilter] = None
+    confirm_all: bool = False  # Required when the filter is empty and so matches every user
+    
+    @model_validator(mode="after")
+    def check_target_and_changes(self):
+        if (self.user_ids is None) == (self.filter is None):
+            raise ValueError("Provide exactly one of user_ids or filter")
+        if self.filter is not None and not self.filter.model_dump(exclude_none=True) and not self.confirm_all:
+            raise ValueError("An empty filter matches every user; set confirm_all to apply it")
+        if self.role is None and self.is_active is None:
+            raise ValueError("Provide role and/or is_active to change")
+        return self
+
+class BulkUserResult(BaseModel):
+    id: int
+    status: str  # 'not_found' or 'skipped'
+    detail: Optional[str] = None
+
+class BulkUpdateResponse(BaseModel):
+    """Counts for the whole run; per-user entries only for users left unchanged, capped."""
+    updated: int
+    skipped: int = 0
+    not_found: int = 0
+    results: List[BulkUserResult] = []
+    results_truncated: bool = False
+
 class UserListResponse(BaseModel):
     id: int
     username: str
@@ -87,6 +123,18 @@ class UserListResponse(BaseModel):
     class Config:
         from_attributes = True
 
+class UserSort(str, Enum):
+    NEWEST = "-created_at"
+    OLDEST = "created_at"
+    USERNAME = "username"
+    USERNAME_DESC = "-username"
+
+class UserPage(BaseModel):
+    items: List[UserListResponse]
+    next_cursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+    total: int
+    total_is_estimate: bool = False
+
 class ChangePassword(BaseModel):
     current_password: str
     new_password: str = Field(..., min_length=8, max_length=100)
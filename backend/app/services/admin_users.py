@@ -0,0 +1,331 @@
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional, Sequence, Tuple
+from fastapi import HTTPException, status
+from sqlalchemy import String, case, func, or_, select, text, tuple_, type_coerce, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+from app.models.user import User
+from app.schemas.user import BulkUpdateResponse, BulkUserResult, UserSort
+from app.services.user_cache import user_cache
+
+# Columns covered by the admin search (trigram-indexed on Postgres)
+SEARCH_COLUMNS = (User.username, User.email, User.first_name, User.last_name)
+
+# Columns written by the export, in output order
+EXPORT_COLUMNS = (
+    User.id, User.username, User.email, User.role, User.is_active, User.is_verified,
+    User.first_name, User.last_name, User.created_at
+)
+
+# Leading characters spreadsheets treat as the start of a formula
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+def csv_safe(value):
+    """Render a value for CSV, quoting user text that a spreadsheet would evaluate."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+# Sort option -> (key column, descending); ties are broken by id in the same direction
+SORT_KEYS = {
+    UserSort.NEWEST: (User.created_at, True),
+    UserSort.OLDEST: (User.created_at, False),
+    UserSort.USERNAME: (User.username, False),
+    UserSort.USERNAME_DESC: (User.username, True),
+}
+
+class UserFilters:
+    """Server-side filters shared by the admin list, export and bulk endpoints."""
+
+    def __init__(
+        self,
+        role: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        is_verified: Optional[bool] = None,
+        search: Optional[str] = None
+    ):
+        self.role = role
+        self.is_active = is_active
+        self.is_verified = is_verified
+        self.search = search.strip() if search else None
+
+    def apply(self, query: Select) -> Select:
+        if self.role is not None:
+            query = query.where(User.role == self.role)
+        if self.is_active is not None:
+            query = query.where(User.is_active == self.is_active)
+        if self.is_verified is not None:
+            query = query.where(User.is_verified == self.is_verified)
+        if self.search:
+            query = query.where(or_(
+                User.username.icontains(self.search, autoescape=True),
+                User.email.icontains(self.search, autoescape=True)
+            ))
+        return query
+
+    @property
+    def is_empty(self) -> bool:
+        return (
+            self.role is None and self.is_active is None
+            and self.is_verified is None and not self.search
+        )
+
+class AdminUserService:
+    """Admin-side queries over the users table."""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.max_exact_count = 10_000  # Counts above this are reported as estimates
+        self.min_search_length = 3  # Shorter queries have too few trigrams to use the index
+        self.export_batch_size = 1000  # Rows fetched per server-side cursor round trip
+        self.bulk_batch_size = 1000  # Users changed per UPDATE statement/commit
+        self.bulk_max_reported = 1000  # Unchanged users listed in a bulk response
+
+    def _sort_key(self, sort: UserSort):
+        """The column a sort pages on, as compared in SQL, and whether it descends."""
+        column, descending = SORT_KEYS[sort]
+        if column is User.created_at and self.db.bind.dialect.name == "sqlite":
+            # SQLite stores timestamps as text in whichever format wrote them (the server
+            # default has no fractional seconds), so page on the stored text itself
+            column = type_coerce(column, String)
+        return column, descending
+
+    def _encode_cursor(self, sort: UserSort, value, user_id: int) -> str:
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        payload = json.dumps([sort.value, value, user_id], separators=(",", ":"))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+    def _decode_cursor(self, sort: UserSort, cursor: str) -> Tuple[object, int]:
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            sort_value, value, user_id = json.loads(base64.urlsafe_b64decode(padded))
+            if sort_value != sort.value:
+                raise ValueError("cursor was issued for a different sort")
+            column, _ = self._sort_key(sort)
+            if column is User.created_at:
+                value = datetime.fromisoformat(value)
+            elif not isinstance(value, str):
+                raise ValueError("cursor value has the wrong type")
+            return value, int(user_id)
+        except Exception:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid cursor"
+            )
+
+    async def list_users(
+        self,
+        filters: UserFilters,
+        sort: UserSort = UserSort.NEWEST,
+        limit: int = 50,
+        cursor: Optional[str] = None
+    ) -> Tuple[List[User], Optional[str]]:
+        """One keyset page of users and the cursor for the next page."""
+        column, descending = self._sort_key(sort)
+        # Select the sort key as compared in SQL so the cursor round-trips exactly
+        query = filters.apply(select(User, column.label("sort_key")))
+
+        if cursor:
+            value, user_id = self._decode_cursor(sort, cursor)
+            position = tuple_(column, User.id)
+            query = query.where(
+                position < tuple_(value, user_id) if descending else position > tuple_(value, user_id)
+            )
+
+        if descending:
+            query = query.order_by(column.desc(), User.id.desc())
+        else:
+            query = query.order_by(column.asc(), User.id.asc())
+
+        # Fetch one extra row to know whether another page exists
+        result = await self.db.execute(query.limit(limit + 1))
+        rows = result.all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_user, last_value = rows[-1]
+            next_cursor = self._encode_cursor(sort, last_value, last_user.id)
+        return [user for user, _ in rows], next_cursor
+
+    async def count_users(self, filters: UserFilters) -> Tuple[int, bool]:
+        """Total matching users as ``(count, is_estimate)``.
+
+        Unfiltered Postgres counts come from planner statistics; otherwise the
+        count stops at ``max_exact_count`` so it never scans millions of rows.
+        """
+        if filters.is_empty and self.db.bind.dialect.name == "postgresql":
+            result = await self.db.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'users'::regclass")
+            )
+            estimate = result.scalar()
+            if estimate is not None and estimate >= 0:
+                return int(estimate), True
+
+        capped = filters.apply(select(User.id)).limit(self.max_exact_count + 1).subquery()
+        result = await self.db.execute(select(func.count()).select_from(capped))
+        count = result.scalar_one()
+        if count > self.max_exact_count:
+            return self.max_exact_count, True
+        return count, False
+
+    async def search_users(self, query: str, limit: int = 20) -> List[User]:
+        """Users matching ``query`` by substring or trigram similarity, best first."""
+        query = query.strip()
+        if len(query) < self.min_search_length:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Search query must be at least {self.min_search_length} characters"
+            )
+
+        contains = [column.icontains(query, autoescape=True) for column in SEARCH_COLUMNS]
+        prefix = or_(
+            User.username.istartswith(query, autoescape=True),
+            User.email.istartswith(query, autoescape=True)
+        )
+
+        if self.db.bind.dialect.name == "postgresql":
+            # ILIKE and the % similarity operator are both served by the GIN trigram indexes
+            similar = [column.op("%")(query) for column in SEARCH_COLUMNS]
+            rank = func.greatest(*(func.similarity(column, query) for column in SEARCH_COLUMNS))
+            condition = or_(*contains, *similar)
+        else:
+            # SQLite (tests/local dev): substring match only
+            rank = case((contains[0], 0.5), else_=0.0)
+            condition = or_(*contains)
+
+        score = rank + case((prefix, 1.0), else_=0.0)
+        result = await self.db.execute(
+            select(User)
+            .where(condition)
+            .order_by(score.desc(), User.username)
+            .limit(limit)
+        )
+        return list(result.scalars().all())
+
+    async def _export_batches(self, filters: UserFilters) -> AsyncIterator[Sequence]:
+        """Matching rows as plain tuples, streamed from a server-side cursor."""
+        query = filters.apply(select(*EXPORT_COLUMNS)).order_by(User.id)
+        result = await self.db.stream(query.execution_options(yield_per=self.export_batch_size))
+        async for batch in result.partitions():
+            yield batch
+
+    async def export_csv(self, filters: UserFilters) -> AsyncIterator[str]:
+        """CSV export, one chunk per fetched batch."""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([column.key for column in EXPORT_COLUMNS])
+
+        async for batch in self._export_batches(filters):
+            writer.writerows([csv_safe(value) for value in row] for row in batch)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+    async def export_ndjson(self, filters: UserFilters) -> AsyncIterator[str]:
+        """Newline-delimited JSON export, one chunk per fetched batch."""
+        keys = [column.key for column in EXPORT_COLUMNS]
+        async for batch in self._export_batches(filters):
+            yield "".join(
+                json.dumps(dict(zip(keys, row)), default=datetime.isoformat) + "\n"
+                for row in batch
+            )
+
+    async def _bulk_targets(
+        self,
+        user_ids: Optional[List[int]],
+        filters: Optional[UserFilters]
+    ) -> AsyncIterator[List[int]]:
+        """Target IDs in batches, either from the request or walked by id from a filter."""
+        if user_ids is not None:
+            unique_ids = list(dict.fromkeys(user_ids))
+            for start in range(0, len(unique_ids), self.bulk_batch_size):
+                yield unique_ids[start:start + self.bulk_batch_size]
+            return
+
+        # Keyset on id so rows the update moves out of the filter are not revisited
+        last_id = 0
+        while True:
+            result = await self.db.execute(
+                filters.apply(select(User.id))
+                .where(User.id > last_id)
+                .order_by(User.id)
+                .limit(self.bulk_batch_size)
+            )
+            batch = list(result.scalars().all())
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]
+
+    async def bulk_update(
+        self,
+        admin: User,
+        values: Dict[str, object],
+        user_ids: Optional[List[int]] = None,
+        filters: Optional[UserFilters] = None
+    ) -> BulkUpdateResponse:
+        """Apply ``values`` with one UPDATE ... RETURNING and commit per batch.
+
+        The acting admin is skipped when the change would alter their own
+        role or deactivate them, matching the single-user endpoints. Only
+        users left unchanged are listed, up to ``bulk_max_reported``.
+        """
+        admin_id = admin.id
+        protect_admin = (
+            values.get("role") not in (None, admin.role)
+            or values.get("is_active") is False
+        )
+        summary = BulkUpdateResponse(updated=0)
+
+        async for batch in self._bulk_targets(user_ids, filters):
+            targets = set(batch)
+            if protect_admin:
+                targets.discard(admin_id)
+
+            updated: Dict[int, str] = {}
+            if targets:
+                result = await self.db.execute(
+                    update(User)
+                    .where(User.id.in_(targets))
+                    .values(**values)
+                    .returning(User.id, User.email)
+                    .execution_options(synchronize_session=False)
+                )
+                updated = dict(result.all())
+                await self.db.commit()
+
+                for email in updated.values():
+                    await user_cache.invalidate(email)
+
+            summary.updated += len(updated)
+            for user_id in batch:
+                if user_id in updated:
+                    continue
+                if user_id == admin_id and protect_admin:
+                    summary.skipped += 1
+                    result = BulkUserResult(
+                        id=user_id,
+                        status="skipped",
+                        detail="Cannot change your own role or deactivate your own account"
+                    )
+                else:
+                    summary.not_found += 1
+                    result = BulkUserResult(id=user_id, status="not_found")
+                
+                if len(summary.results) < self.bulk_max_reported:
+                    summary.results.append(result)
+                else:
+                    summary.results_truncated = True
+
+        return summary
@@ -1,28 +1,38 @@
 from datetime import datetime, timedelta
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from app.models.user import User, OTPCode
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.orm.attributes import set_committed_value
+from app.models.user import User, EmailOutbox
 from app.schemas.user import UserCreate
-from app.utils.auth import get_password_hash, verify_password
-from app.utils.otp import generate_otp_code, get_otp_expiry, is_otp_expired
+from app.utils.auth import get_password_hash_async, verify_password_async
+from app.utils.otp import generate_otp_code
 from app.services.email import email_service
+from app.services.otp_store import otp_store
+from app.services.user_cache import user_cache
 from app.core.config import settings
 
 class AuthService:
-    def __init__(self, db: Session):
+    def __init__(self, db: AsyncSession):
         self.db = db
 
-    def get_user_by_email(self, email: str) -> User:
+    async def get_user_by_id(self, user_id: int) -> User:
+        """Get user by id."""
+        return await self.db.get(User, user_id)
+
+    async def get_user_by_email(self, email: str) -> User:
         """Get user by email."""
-        return self.db.query(User).filter(User.email == email).first()
+        result = await self.db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
 
-    def get_user_by_username(self, username: str) -> User:
+    async def get_user_by_username(self, username: str) -> User:
         """Get user by username."""
-        return self.db.query(User).filter(User.username == username).first()
+        result = await self.db.execute(select(User).where(User.username == username))
+        return result.scalars().first()
 
-    def create_user(self, user_data: UserCreate) -> User:
+    async def create_user(self, user_data: UserCreate) -> User:
         """Create new user."""
-        hashed_password = get_password_hash(user_data.password)
+        hashed_password = await get_password_hash_async(user_data.password)
         db_user = User(
             username=user_data.username,
             email=user_data.email,
@@ -31,123 +41,169 @@ class AuthService:
             is_verified=False
         )
         self.db.add(db_user)
-        self.db.commit()
-        self.db.refresh(db_user)
+        await self.db.commit()
+        await self.db.refresh(db_user)
         return db_user
 
-    def authenticate_user(self, username: str, password: str) -> User:
-        """Authenticate user with username and password."""
-        user = self.get_user_by_username(username)
+    async def authenticate_user(self, username: str, password: str) -> User:
+        """Authenticate user with username and password.
+
+        Lockout bookkeeping is done in single conditional UPDATEs so parallel
+        attempts cannot lose increments. A correct password re-reads the
+        lockout state after bcrypt and only writes when there is a count or
+        an expired lock to clear.
+        """
+        user = await self.get_user_by_username(username)
         if not user:
             return None
         
-        # Check if user is locked out
+        # Cheap early exit; the authoritative check is the re-read below
         if user.locked_until and datetime.utcnow() < user.locked_until:
             return None
         
-        # Reset failed attempts if lockout period has passed
-        if user.locked_until and datetime.utcnow() >= user.locked_until:
-            user.failed_login_attempts = 0
-            user.locked_until = None
-            self.db.commit()
+        if not await verify_password_async(password, user.hashed_password):
+            await self._record_failed_login(user)
+            return None
         
-        if not verify_password(password, user.hashed_password):
-            # Increment failed attempts
-            user.failed_login_attempts += 1
-            
-            # Lock account if max attempts reached
-            if user.failed_login_attempts >= settings.MAX_LOGIN_ATTEMPTS:
-                user.locked_until = datetime.utcnow() + timedelta(minutes=settings.LOCKOUT_DURATION_MINUTES)
-            
-            self.db.commit()
+        # Parallel guesses may have locked the account while bcrypt ran; a lock
+        # committed after this read is ordered after the successful login
+        result = await self.db.execute(
+            select(User.locked_until, User.failed_login_attempts).where(User.id == user.id)
+        )
+        state = result.first()
+        if state is None:
+            return None
+        now = datetime.utcnow()
+        if state.locked_until and now < state.locked_until:
             return None
         
-        # Reset failed attempts on successful login
-        if user.failed_login_attempts > 0:
-            user.failed_login_attempts = 0
-            self.db.commit()
+        if state.failed_login_attempts or state.locked_until is not None:
+            result = await self.db.execute(
+                update(User)
+                .where(User.id == user.id, self._not_locked(now))
+                .values(failed_login_attempts=0, locked_until=None)
+                .returning(User.id)
+                .execution_options(synchronize_session=False)
+            )
+            unlocked = result.scalar() is not None
+            await self.db.commit()
+            if not unlocked:
+                return None
         
+        set_committed_value(user, "failed_login_attempts", 0)
+        set_committed_value(user, "locked_until", None)
         return user
 
-    async def create_otp_code(self, email: str, purpose: str) -> bool:
-        """Create and send OTP code."""
-        # Invalidate existing OTP codes for this email and purpose
-        self.db.query(OTPCode).filter(
-            and_(OTPCode.email == email, OTPCode.purpose == purpose)
-        ).update({"is_used": True})
-        
-        # Generate new OTP
-        otp_code = generate_otp_code()
-        expires_at = get_otp_expiry()
+    def _not_locked(self, now: datetime):
+        return or_(User.locked_until.is_(None), User.locked_until <= now)
+
+    async def _record_failed_login(self, user: User) -> None:
+        """Count a failed attempt and lock the account once the limit is hit."""
+        now = datetime.utcnow()
         
-        db_otp = OTPCode(
-            email=email,
-            code=otp_code,
-            purpose=purpose,
-            expires_at=expires_at
+        # An expired lockout starts a fresh count
+        attempts = case(
+            (User.locked_until.is_not(None), 1),
+            else_=func.coalesce(User.failed_login_attempts, 0) + 1
         )
-        self.db.add(db_otp)
-        self.db.commit()
-        
-        # Send email
-        return await email_service.send_otp_email(email, otp_code, purpose)
-
-    def verify_otp_code(self, email: str, code: str, purpose: str) -> bool:
-        """Verify OTP code."""
-        otp_record = self.db.query(OTPCode).filter(
-            and_(
-                OTPCode.email == email,
-                OTPCode.code == code,
-                OTPCode.purpose == purpose,
-                OTPCode.is_used == False
+        result = await self.db.execute(
+            update(User)
+            .where(User.id == user.id, self._not_locked(now))
+            .values(
+                failed_login_attempts=attempts,
+                locked_until=case(
+                    (attempts >= settings.MAX_LOGIN_ATTEMPTS,
+                     now + timedelta(minutes=settings.LOCKOUT_DURATION_MINUTES)),
+                    else_=None
+                )
             )
-        ).first()
+            .returning(User.failed_login_attempts, User.locked_until)
+            .execution_options(synchronize_session=False)
+        )
+        row = result.first()
+        await self.db.commit()
         
-        if not otp_record:
-            return False
+        if row is not None:
+            set_committed_value(user, "failed_login_attempts", row.failed_login_attempts)
+            set_committed_value(user, "locked_until", row.locked_until)
+
+    async def create_otp_code(self, email: str, purpose: str) -> bool:
+        """Create and send OTP code."""
+        otp_code = generate_otp_code()
+        await otp_store.issue(self.db, email, purpose, otp_code, settings.OTP_EXPIRE_MINUTES * 60)
         
-        if is_otp_expired(otp_record.expires_at):
-            return False
+        rendered = email_service.render_otp_email(otp_code, purpose)
+        
+        # Durable outbox: the email row commits atomically with the OTP and the dispatcher sends it
+        if settings.EMAIL_DURABLE_OUTBOX:
+            self.db.add(EmailOutbox(
+                to_email=email,
+                subject=rendered.subject,
+                html_body=rendered.html,
+                text_body=rendered.text
+            ))
+            await self.db.commit()
+            return True
         
-        # Mark OTP as used
-        otp_record.is_used = True
-        self.db.commit()
+        await self.db.commit()
         
-        return True
+        # Send email
+        return await email_service.send_email(email, rendered.subject, rendered.html, rendered.text)
+
+    async def verify_otp_code(self, email: str, code: str, purpose: str) -> bool:
+        """Verify OTP code and consume it."""
+        return await otp_store.consume(self.db, email, purpose, code)
 
-    def verify_user_email(self, email: str):
+    async def verify_user_email(self, email: str):
         """Mark user as verified."""
-        user = self.get_user_by_email(email)
+        user = await self.get_user_by_email(email)
         if user:
             user.is_verified = True
-            self.db.commit()
+            await self.db.commit()
+            await user_cache.invalidate(email)
 
-    def reset_user_password(self, email: str, new_password: str):
+    async def reset_user_password(self, email: str, new_password: str):
         """Reset user password."""
-        user = self.get_user_by_email(email)
+        user = await self.get_user_by_email(email)
         if user:
-            user.hashed_password = get_password_hash(new_password)
+            user.hashed_password = await get_password_hash_async(new_password)
             user.failed_login_attempts = 0
             user.locked_until = None
-            self.db.commit()
+            await self.db.commit()
+            await user_cache.invalidate(email)
 
-    def update_user_profile(self, user: User, profile_data: dict) -> User:
+    async def update_user_profile(self, user: User, profile_data: dict) -> User:
         """Update user profile information."""
         for field, value in profile_data.items():
             if hasattr(user, field) and value is not None:
                 setattr(user, field, value)
         
-        self.db.commit()
-        self.db.refresh(user)
+        await self.db.commit()
+        await self.db.refresh(user)
+        await user_cache.invalidate(user.email)
+        return user
+
+    async def set_user_avatar(self, user: User, avatar_url: Optional[str], avatar_variants: Optional[dict]) -> User:
+        """Set (or clear, with None) the user's avatar and its variants."""
+        user.avatar_url = avatar_url
+        user.avatar_variants = avatar_variants
+        
+        await self.db.commit()
+        await self.db.refresh(user)
+        await user_cache.invalidate(user.email)
         return user
 
-    def change_user_password(self, user: User, current_password: str, new_password: str) -> bool:
+    async def change_user_password(self, user: User, current_password: str, new_password: str) -> bool:
         """Change user password after verifying current password."""
-        if not verify_password(current_password, user.hashed_password):
+        # ``user`` may come from the user cache, which never holds password hashes
+        result = await self.db.execute(select(User.hashed_password).where(User.id == user.id))
+        hashed_password = result.scalar()
+        if hashed_password is None or not await verify_password_async(current_password, hashed_password):
             return False
         
-        user.hashed_password = get_password_hash(new_password)
+        user.hashed_password = await get_password_hash_async(new_password)
         user.failed_login_attempts = 0
         user.locked_until = None
-        self.db.commit()
+        await self.db.commit()
+        await user_cache.invalidate(user.email)
         return True
\ No newline at end of file
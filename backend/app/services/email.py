@@ -1,11 +1,18 @@
-import aiosmtplib
 import smtplib
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from jinja2 import Template
+from typing import List, Optional
 from app.core.config import settings
+from app.core.executors import BoundedExecutor
+from app.core.metrics import SMTP_SEND_LATENCY
+from app.services.email_templates import RenderedEmail, email_templates
+from app.services.smtp_pool import SMTPConnectionPool
+from app.utils.circuit_breaker import CircuitBreaker
+
+logger = logging.getLogger(__name__)
 
 class EmailService:
     def __init__(self):
@@ -14,160 +21,208 @@ class EmailService:
         self.smtp_username = settings.SMTP_USERNAME
         self.smtp_password = settings.SMTP_PASSWORD
         self.smtp_use_ssl = settings.SMTP_USE_SSL
+        self.smtp_use_starttls = settings.SMTP_USE_STARTTLS
+        self.pool = SMTPConnectionPool(
+            host=self.smtp_host,
+            port=self.smtp_port,
+            username=self.smtp_username,
+            password=self.smtp_password,
+            size=settings.SMTP_POOL_SIZE,
+            use_starttls=self.smtp_use_starttls,
+            keepalive=settings.SMTP_KEEPALIVE_SECONDS,
+            timeout=settings.SMTP_TIMEOUT_SECONDS
+        )
+        self.circuit = CircuitBreaker(
+            failure_threshold=settings.SMTP_CIRCUIT_FAILURE_THRESHOLD,
+            reset_timeout=settings.SMTP_CIRCUIT_RESET_SECONDS
+        )
+        self.fallback_executor = BoundedExecutor(
+            name="smtp-fallback",
+            max_workers=settings.SMTP_FALLBACK_WORKERS,
+            max_queue=settings.SMTP_FALLBACK_QUEUE_SIZE
+        )
+        self._outbox: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+
+    async def start(self):
+        """Start background delivery workers; sends are queued from now on."""
+        if self._outbox is not None:
+            return
+        
+        self._outbox = asyncio.Queue(maxsize=settings.EMAIL_OUTBOX_MAX_SIZE)
+        self._workers = [
+            asyncio.create_task(self._delivery_worker())
+            for _ in range(settings.EMAIL_OUTBOX_WORKERS)
+        ]
 
-    async def send_email(self, to_email: str, subject: str, html_content: str):
-        """Send email using SMTP."""
+    async def stop(self, drain_timeout: float = 10):
+        """Flush queued mail (up to ``drain_timeout``), stop workers and close connections."""
+        if self._outbox is not None:
+            try:
+                await asyncio.wait_for(self._outbox.join(), timeout=drain_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Shutting down with undelivered emails", extra={"undelivered": self._outbox.qsize()})
+            
+            for worker in self._workers:
+                worker.cancel()
+            await asyncio.gather(*self._workers, return_exceptions=True)
+            self._workers = []
+            self._outbox = None
+        
+        await self.pool.close()
+        self.fallback_executor.shutdown(wait=False)
+
+    async def send_email(
+        self,
+        to_email: str,
+        subject: str,
+        html_content: str,
+        text_content: Optional[str] = None
+    ):
+        """Send email using SMTP, via the background outbox when it is running."""
         # In development mode, just log the email instead of sending
         if settings.DEVELOPMENT_MODE:
-            print(f"[DEV MODE] Email to {to_email}")
-            print(f"[DEV MODE] Subject: {subject}")
-            print(f"[DEV MODE] Content: {html_content}")
+            logger.info("Development mode email (not sent)", extra={"to_email": to_email, "subject": subject})
+            # The body carries OTP codes, so it only appears with LOG_LEVEL=DEBUG
+            logger.debug(
+                "Development mode email body",
+                extra={"to_email": to_email, "content": text_content or html_content}
+            )
             return True
         
-        print(f"📧 [PRODUCTION] Sending email to: {to_email}")
-        print(f"📧 [PRODUCTION] Subject: {subject}")
-        print(f"📧 [PRODUCTION] SMTP Config: {self.smtp_host}:{self.smtp_port}")
-            
         message = MIMEMultipart("alternative")
         message["Subject"] = subject
         message["From"] = self.smtp_username
         message["To"] = to_email
 
+        # Plain text first so clients prefer the HTML part
+        if text_content:
+            message.attach(MIMEText(text_content, "plain"))
         html_part = MIMEText(html_content, "html")
         message.attach(html_part)
 
+        if self._outbox is None:
+            return await self._deliver(message, to_email)
+        
         try:
-            print(f"📧 [PRODUCTION] Attempting to connect to SMTP server...")
-            
-            # Use aiosmtplib with proper SSL configuration for port 465
-            if self.smtp_port == 465:
-                print(f"📧 [PRODUCTION] Using SSL connection (port 465)")
-                
-                # Create SMTP client with SSL
-                smtp_client = aiosmtplib.SMTP(
-                    hostname=self.smtp_host,
-                    port=self.smtp_port,
-                    use_tls=True,
-                    validate_certs=False,  # Some servers have certificate issues
-                    timeout=30
-                )
-                
-                await smtp_client.connect()
-                await smtp_client.login(self.smtp_username, self.smtp_password)
-                await smtp_client.send_message(message)
-                await smtp_client.quit()
-                
-                print(f"✅ [PRODUCTION] Email sent successfully via SSL (port 465)")
-                return True
-            else:
-                # For other ports, use STARTTLS
-                print(f"📧 [PRODUCTION] Using STARTTLS connection (port {self.smtp_port})")
-                
-                smtp_client = aiosmtplib.SMTP(
-                    hostname=self.smtp_host,
-                    port=self.smtp_port,
-                    timeout=30
-                )
-                
-                await smtp_client.connect()
-                await smtp_client.starttls(validate_certs=False)
-                await smtp_client.login(self.smtp_username, self.smtp_password)
-                await smtp_client.send_message(message)
-                await smtp_client.quit()
-                
-                print(f"✅ [PRODUCTION] Email sent successfully via STARTTLS")
-                return True
-            
-        except Exception as e:
-            print(f"⚠️ [PRODUCTION] aiosmtplib failed: {str(e)}")
-            print(f"📧 [PRODUCTION] Trying fallback with standard smtplib...")
-            
-            # Fallback to standard smtplib in thread pool
+            self._outbox.put_nowait((message, to_email, 0))
+        except asyncio.QueueFull:
+            logger.error("Email outbox full, rejecting email", extra={"to_email": to_email})
+            return False
+        
+        return True
+
+    async def _delivery_worker(self):
+        """Deliver queued emails, re-queueing failures with exponential backoff."""
+        loop = asyncio.get_running_loop()
+        
+        while True:
+            message, to_email, attempt = await self._outbox.get()
             try:
-                loop = asyncio.get_event_loop()
-                with ThreadPoolExecutor() as executor:
-                    result = await loop.run_in_executor(
-                        executor, 
-                        self._send_email_sync, 
-                        message, 
-                        to_email
-                    )
-                    return result
-            except Exception as fallback_error:
-                print(f"❌ [PRODUCTION] All SMTP attempts failed for {to_email}")
-                print(f"❌ [PRODUCTION] aiosmtplib error: {str(e)}")
-                print(f"❌ [PRODUCTION] smtplib fallback error: {str(fallback_error)}")
-                
-                # Provide helpful troubleshooting info
-                print(f"🔧 [PRODUCTION] Troubleshooting info:")
-                print(f"   - SMTP Host: {self.smtp_host}")
-                print(f"   - SMTP Port: {self.smtp_port}")
-                print(f"   - Username: {self.smtp_username}")
-                print(f"   - Check if email account allows app passwords")
-                print(f"   - Verify SMTP credentials are correct")
+                if not await self._deliver(message, to_email):
+                    if attempt < settings.EMAIL_MAX_RETRIES:
+                        delay = settings.EMAIL_RETRY_BACKOFF_SECONDS * (2 ** attempt)
+                        logger.info("Retrying email", extra={"to_email": to_email, "delay_seconds": delay, "attempt": attempt + 1})
+                        loop.call_later(delay, self._requeue, message, to_email, attempt + 1)
+                    else:
+                        logger.error("Giving up on email", extra={"to_email": to_email, "attempts": attempt + 1})
+            except Exception:
+                logger.exception("Email worker error", extra={"to_email": to_email})
+            finally:
+                self._outbox.task_done()
+
+    def _requeue(self, message, to_email: str, attempt: int):
+        if self._outbox is None:
+            return
+        try:
+            self._outbox.put_nowait((message, to_email, attempt))
+        except asyncio.QueueFull:
+            logger.error("Email outbox full, dropping retry", extra={"to_email": to_email})
+
+    async def _deliver(self, message, to_email: str) -> bool:
+        """Send one message over a pooled connection, falling back to smtplib."""
+        admitted = self.circuit.allow_request()
+        if admitted:
+            start = time.perf_counter()
+            try:
+                await self.pool.send_message(message)
+                SMTP_SEND_LATENCY.labels("pool", "success").observe(time.perf_counter() - start)
+                self.circuit.record_success()
+                logger.info("Email sent", extra={"to_email": to_email, "transport": "pool"})
+                return True
                 
+            except Exception as e:
+                SMTP_SEND_LATENCY.labels("pool", "failure").observe(time.perf_counter() - start)
+                self.circuit.record_failure(admitted)
+                primary_error = str(e)
+                logger.warning("Pooled SMTP send failed", extra={"to_email": to_email, "error": primary_error})
+            finally:
+                self.circuit.release(admitted)
+        else:
+            primary_error = f"circuit {self.circuit.state} after {self.circuit.failures} consecutive failures"
+            if settings.SMTP_CIRCUIT_OPEN_MODE == "fail_fast":
+                logger.error("SMTP circuit open, not sending", extra={"to_email": to_email, "error": primary_error})
                 return False
+        
+        # Fallback to standard smtplib on the shared, bounded fallback pool
+        start = time.perf_counter()
+        try:
+            sent = await self.fallback_executor.run(self._send_email_sync, message, to_email)
+            SMTP_SEND_LATENCY.labels("smtplib", "success" if sent else "failure").observe(time.perf_counter() - start)
+            return sent
+        except Exception as fallback_error:
+            SMTP_SEND_LATENCY.labels("smtplib", "failure").observe(time.perf_counter() - start)
+            # Include the connection details needed to troubleshoot credentials/app passwords
+            logger.error(
+                "All SMTP attempts failed",
+                extra={
+                    "to_email": to_email,
+                    "error": primary_error,
+                    "fallback_error": str(fallback_error),
+                    "smtp_host": self.smtp_host,
+                    "smtp_port": self.smtp_port,
+                    "smtp_username": self.smtp_username,
+                }
+            )
+            
+            return False
 
     def _send_email_sync(self, message, to_email: str):
         """Synchronous email sending using standard smtplib (fallback method)."""
-        print(f"📧 [PRODUCTION] Using smtplib fallback for {to_email}")
+        logger.debug("Using smtplib fallback", extra={"to_email": to_email})
         
         try:
             if self.smtp_port == 465:
                 # SSL connection
-                print(f"📧 [PRODUCTION] smtplib: Using SSL connection (port 465)")
-                server = smtplib.SMTP_SSL(self.smtp_host, self.smtp_port, timeout=30)
+                logger.debug("smtplib: using SSL connection", extra={"smtp_port": self.smtp_port})
+                server = smtplib.SMTP_SSL(self.smtp_host, self.smtp_port, timeout=settings.SMTP_TIMEOUT_SECONDS)
             else:
                 # STARTTLS connection
-                print(f"📧 [PRODUCTION] smtplib: Using STARTTLS connection (port {self.smtp_port})")
-                server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=30)
-                server.starttls()
+                logger.debug("smtplib: using plain/STARTTLS connection", extra={"smtp_port": self.smtp_port})
+                server = smtplib.SMTP(self.smtp_host, self.smtp_port, timeout=settings.SMTP_TIMEOUT_SECONDS)
+                if self.smtp_use_starttls:
+                    server.starttls()
             
-            server.login(self.smtp_username, self.smtp_password)
+            if self.smtp_password:
+                server.login(self.smtp_username, self.smtp_password)
             server.send_message(message)
             server.quit()
             
-            print(f"✅ [PRODUCTION] Email sent successfully via smtplib fallback")
+            logger.info("Email sent", extra={"to_email": to_email, "transport": "smtplib"})
             return True
             
         except Exception as e:
-            print(f"❌ [PRODUCTION] smtplib fallback also failed: {str(e)}")
+            logger.debug("smtplib fallback failed", extra={"to_email": to_email, "error": str(e)})
             raise e
 
+    def render_otp_email(self, otp_code: str, purpose: str) -> RenderedEmail:
+        """Render the subject, text and HTML bodies of an OTP email."""
+        return email_templates.render_otp(purpose, otp_code)
+
     async def send_otp_email(self, to_email: str, otp_code: str, purpose: str):
         """Send OTP verification email."""
-        if purpose == "registration":
-            subject = "Verify Your Account - OTP Code"
-            template_content = """
-            <html>
-            <body>
-                <h2>Welcome to Auth System!</h2>
-                <p>Your verification code is: <strong>{{ otp_code }}</strong></p>
-                <p>This code will expire in {{ expire_minutes }} minutes.</p>
-                <p>If you didn't request this code, please ignore this email.</p>
-            </body>
-            </html>
-            """
-        else:  # password_reset
-            subject = "Password Reset - OTP Code"
-            template_content = """
-            <html>
-            <body>
-                <h2>Password Reset Request</h2>
-                <p>Your password reset code is: <strong>{{ otp_code }}</strong></p>
-                <p>This code will expire in {{ expire_minutes }} minutes.</p>
-                <p>If you didn't request this reset, please ignore this email.</p>
-            </body>
-            </html>
-            """
-
-        template = Template(template_content)
-        html_content = template.render(
-            otp_code=otp_code,
-            expire_minutes=settings.OTP_EXPIRE_MINUTES
-        )
-
-        return await self.send_email(to_email, subject, html_content)
+        rendered = self.render_otp_email(otp_code, purpose)
+        return await self.send_email(to_email, rendered.subject, rendered.html, rendered.text)
 
 # Global email service instance
 email_service = EmailService()
\ No newline at end of file
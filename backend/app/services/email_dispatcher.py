@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy import and_, or_, select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.user import EmailOutbox
+from app.services.email import email_service
+
+logger = logging.getLogger(__name__)
+
+class EmailDispatcher:
+    """Claims pending email_outbox rows in batches and delivers them concurrently.
+
+    Rows are claimed with ``SELECT ... FOR UPDATE SKIP LOCKED`` so any number
+    of dispatcher replicas can share the table without double-sending.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.batch_size = settings.EMAIL_DISPATCHER_BATCH_SIZE
+        self.poll_interval = settings.EMAIL_DISPATCHER_POLL_SECONDS
+        self.lease = timedelta(seconds=settings.EMAIL_DISPATCHER_LEASE_SECONDS)
+        self._send_slots = asyncio.Semaphore(settings.EMAIL_DISPATCHER_CONCURRENCY)
+
+    async def claim_batch(self) -> List[EmailOutbox]:
+        """Lease up to ``batch_size`` due rows, including stale leases from crashed dispatchers."""
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            result = await db.execute(
+                select(EmailOutbox)
+                .where(
+                    or_(
+                        and_(EmailOutbox.status == "pending", EmailOutbox.available_at <= now),
+                        and_(EmailOutbox.status == "sending", EmailOutbox.locked_at < now - self.lease)
+                    )
+                )
+                .order_by(EmailOutbox.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = result.scalars().all()
+
+            for row in rows:
+                row.status = "sending"
+                row.locked_at = now
+                row.attempts += 1
+
+            await db.commit()
+            return rows
+
+    async def _send(self, row: EmailOutbox) -> Optional[str]:
+        """Deliver one row; returns an error message on failure."""
+        async with self._send_slots:
+            try:
+                if await email_service.send_email(row.to_email, row.subject, row.html_body, row.text_body):
+                    return None
+                return "SMTP delivery failed"
+            except Exception as e:
+                return str(e)
+
+    async def _record_results(self, rows: List[EmailOutbox], errors: List[Optional[str]]) -> None:
+        now = datetime.utcnow()
+        async with self.session_factory() as db:
+            for row, error in zip(rows, errors):
+                row = await db.merge(row, load=False)
+                row.locked_at = None
+                if error is None:
+                    row.status = "sent"
+                    row.sent_at = now
+                    row.last_error = None
+                elif row.attempts > settings.EMAIL_MAX_RETRIES:
+                    row.status = "failed"
+                    row.last_error = error
+                else:
+                    row.status = "pending"
+                    row.last_error = error
+                    backoff = settings.EMAIL_RETRY_BACKOFF_SECONDS * (2 ** (row.attempts - 1))
+                    row.available_at = now + timedelta(seconds=backoff)
+            await db.commit()
+
+    async def run_once(self) -> int:
+        """Claim and deliver one batch; returns the number of rows processed."""
+        rows = await self.claim_batch()
+        if not rows:
+            return 0
+
+        errors = await asyncio.gather(*(self._send(row) for row in rows))
+        await self._record_results(rows, errors)
+
+        sent = sum(1 for error in errors if error is None)
+        logger.info("Delivered outbox batch", extra={"sent": sent, "claimed": len(rows)})
+        return len(rows)
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        """Poll the outbox until ``stop_event`` is set."""
+        while not stop_event.is_set():
+            try:
+                processed = await self.run_once()
+            except Exception:
+                logger.exception("Outbox batch failed")
+                processed = 0
+
+            # Keep draining while there is a backlog, otherwise wait for new rows
+            if processed < self.batch_size:
+                try:
+                    await asyncio.wait_for(stop_event.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+        await email_service.stop()
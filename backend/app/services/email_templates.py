@@ -0,0 +1,69 @@
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from app.core.config import settings
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates" / "email"
+
+OTP_SUBJECTS = {
+    "registration": "Verify Your Account - OTP Code",
+    "password_reset": "Password Reset - OTP Code"
+}
+
+# Stands in for the code when OTP templates are pre-rendered
+_OTP_PLACEHOLDER = "__OTP_CODE__"
+
+class RenderedEmail(NamedTuple):
+    subject: str
+    text: str
+    html: str
+
+class EmailTemplateRegistry:
+    """Compiled email templates, loaded once with a Jinja2 bytecode cache.
+
+    OTP emails only vary by code, so each purpose is rendered once up front
+    and split around the code; sending one is then a string join.
+    """
+
+    def __init__(self, directory: Path, bytecode_cache_dir: Optional[str] = None):
+        self.env = Environment(
+            loader=FileSystemLoader(str(directory)),
+            autoescape=select_autoescape(["html"]),
+            bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir),
+            auto_reload=False
+        )
+        self._otp_parts: Dict[str, Dict[str, List[str]]] = {}
+
+    def load(self) -> None:
+        """Compile every template and pre-render the OTP emails."""
+        for name in self.env.list_templates():
+            self.env.get_template(name)
+
+        for purpose in OTP_SUBJECTS:
+            self._otp_parts[purpose] = {
+                variant: self.render(
+                    f"{purpose}.{variant}",
+                    otp_code=_OTP_PLACEHOLDER,
+                    expire_minutes=settings.OTP_EXPIRE_MINUTES
+                ).split(_OTP_PLACEHOLDER)
+                for variant in ("txt", "html")
+            }
+
+    def render(self, name: str, **context) -> str:
+        return self.env.get_template(name).render(**context)
+
+    def render_otp(self, purpose: str, otp_code: str) -> RenderedEmail:
+        """Fill an OTP code into the pre-rendered email for ``purpose``."""
+        if purpose not in self._otp_parts:
+            raise ValueError(f"Unknown OTP purpose: {purpose}")
+
+        parts = self._otp_parts[purpose]
+        return RenderedEmail(
+            subject=OTP_SUBJECTS[purpose],
+            text=otp_code.join(parts["txt"]),
+            html=otp_code.join(parts["html"])
+        )
+
+# Global template registry, compiled at import
+email_templates = EmailTemplateRegistry(TEMPLATES_DIR, settings.EMAIL_TEMPLATE_CACHE_DIR)
+email_templates.load()
@@ -1,31 +1,141 @@
+import asyncio
+import hashlib
+import io
+import logging
 import os
-import uuid
-import aiofiles
-from PIL import Image
+import re
+from PIL import Image, UnidentifiedImageError
 from fastapi import UploadFile, HTTPException, status
-from typing import Optional
+from sqlalchemy import delete, update
+from typing import Awaitable, Callable, Dict, List, NamedTuple, Optional, Set
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.executors import BoundedExecutor
+from app.core.metrics import IMAGE_PROCESSING_LATENCY, observe
+from app.models.user import AvatarBlob
+from app.services.storage import create_storage_backend
+
+logger = logging.getLogger(__name__)
+
+# '<sha256>.<ext>' names written by _store_avatar; older uploads used uuid4 names
+CONTENT_ADDRESSED_KEY = re.compile(r"^[0-9a-f]{64}\.")
+
+# Leading bytes of each accepted format, mapped to Pillow's format name
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+)
+
+def sniff_image_format(header: bytes) -> Optional[str]:
+    """Identify an image format from its magic bytes."""
+    for signature, image_format in IMAGE_SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+try:
+    # Registers AVIF support with Pillow when the plugin is installed
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# Output formats in order of preference: (format name, Pillow encoder, extension, save options)
+AVATAR_FORMATS = (
+    ("avif", "AVIF", "avif", {"quality": 60}),
+    ("webp", "WEBP", "webp", {"quality": 80, "method": 4}),
+    ("jpeg", "JPEG", "jpg", {"quality": 85, "optimize": True}),
+)
+
+def available_avatar_formats() -> List[str]:
+    """Output formats this Pillow build can encode."""
+    Image.init()
+    return [name for name, encoder, _, _ in AVATAR_FORMATS if encoder in Image.SAVE]
+
+def process_avatar_image(data: bytes, sizes: List[int], formats: List[str]) -> Dict[int, Dict[str, bytes]]:
+    """Process avatar image - decode once, then resize and encode every variant.
+
+    Returns ``{size: {format: bytes}}``. Module-level so it can run in a
+    worker process.
+    """
+    encoders = {name: (encoder, options) for name, encoder, _, options in AVATAR_FORMATS}
+    
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            largest = max(sizes)
+            # Let JPEG decode at reduced scale when the source is much larger
+            img.draft('RGB', (largest, largest))
+            
+            # Convert to RGB if necessary (for PNG with transparency)
+            if img.mode in ('RGBA', 'LA', 'P'):
+                # Create white background
+                background = Image.new('RGB', img.size, (255, 255, 255))
+                if img.mode == 'P':
+                    img = img.convert('RGBA')
+                background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
+                img = background
+            elif img.mode != 'RGB':
+                img = img.convert('RGB')
+            
+            # Downscale once to the largest variant; smaller ones derive from it
+            img.thumbnail((largest, largest), Image.Resampling.LANCZOS)
+            
+            variants = {}
+            for size in sorted(sizes, reverse=True):
+                resized = img.copy()
+                resized.thumbnail((size, size), Image.Resampling.LANCZOS)
+                
+                # Create square image with white background and center the image
+                square_img = Image.new('RGB', (size, size), (255, 255, 255))
+                x = (size - resized.width) // 2
+                y = (size - resized.height) // 2
+                square_img.paste(resized, (x, y))
+                
+                # Encode optimized images
+                variants[size] = {}
+                for name in formats:
+                    encoder, options = encoders[name]
+                    output = io.BytesIO()
+                    square_img.save(output, encoder, **options)
+                    variants[size][name] = output.getvalue()
+            
+            return variants
+            
+    except Exception as e:
+        raise Exception(f"Image processing failed: {str(e)}")
+
+class StoredAvatar(NamedTuple):
+    url: str
+    variants: Dict[str, Dict[str, str]]  # {"96": {"webp": "/uploads/...", ...}, ...}
 
 class FileUploadService:
-    def __init__(self):
-        self.upload_dir = "uploads"
-        self.avatar_dir = os.path.join(self.upload_dir, "avatars")
-        self.max_file_size = 5 * 1024 * 1024  # 5MB
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.storage = create_storage_backend()
+        self.max_file_size = settings.AVATAR_MAX_FILE_SIZE
         self.allowed_extensions = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
-        self.avatar_size = (200, 200)  # Avatar dimensions
+        self.avatar_size = (200, 200)  # Default avatar dimensions (avatar_url)
+        self.variant_sizes = [48, 96, 200, 400]
+        self.variant_formats = available_avatar_formats()
+        self.max_image_pixels = 40_000_000  # Reject decompression bombs from the header
+        self.chunk_size = 64 * 1024
         
-        # Create directories if they don't exist
-        os.makedirs(self.avatar_dir, exist_ok=True)
+        # Pillow work is CPU-bound, so it runs in a bounded worker pool
+        self.image_executor = BoundedExecutor(
+            name="avatar-image",
+            max_workers=settings.AVATAR_PROCESSING_WORKERS,
+            max_queue=settings.AVATAR_PROCESSING_QUEUE_SIZE,
+            kind=settings.AVATAR_PROCESSING_EXECUTOR
+        )
+        self._jobs: Set[asyncio.Task] = set()
 
     def _get_file_extension(self, filename: str) -> str:
         """Get file extension from filename."""
         return os.path.splitext(filename)[1].lower()
 
-    def _generate_unique_filename(self, original_filename: str) -> str:
-        """Generate unique filename while preserving extension."""
-        extension = self._get_file_extension(original_filename)
-        unique_id = str(uuid.uuid4())
-        return f"{unique_id}{extension}"
-
     def _validate_image_file(self, file: UploadFile) -> None:
         """Validate uploaded image file."""
         if not file.filename:
@@ -47,82 +157,281 @@ class FileUploadService:
                 detail=f"File too large. Maximum size: {self.max_file_size // (1024*1024)}MB"
             )
 
-    async def save_avatar(self, file: UploadFile, user_id: int) -> str:
-        """Save and process avatar image."""
-        self._validate_image_file(file)
+    def _file_too_large(self) -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"File too large. Maximum size: {self.max_file_size // (1024*1024)}MB"
+        )
+
+    def _check_image_header(self, buffer: io.BytesIO) -> bool:
+        """Validate dimensions from the bytes received so far, read in place.
+
+        Returns False if more data is needed to read the dimensions.
+        """
+        buffer.seek(0)
+        try:
+            with Image.open(buffer) as img:
+                width, height = img.size
+        except Image.DecompressionBombError:
+            width, height = None, None
+        except (UnidentifiedImageError, SyntaxError, OSError):
+            return False
+        finally:
+            buffer.seek(0, io.SEEK_END)
         
-        # Generate unique filename
-        filename = self._generate_unique_filename(file.filename)
-        file_path = os.path.join(self.avatar_dir, filename)
+        if width is None or width * height > self.max_image_pixels:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Image dimensions too large"
+            )
+        return True
+
+    async def _read_upload(self, file: UploadFile) -> bytes:
+        """Read an upload in chunks, enforcing the size cap and header checks as data arrives.
+
+        The request body itself is capped by BodySizeLimitMiddleware; this
+        bounds the file part and rejects non-images from the first chunk.
+        """
+        buffer = io.BytesIO()
+        header_checked = False
+        next_probe = 0
         
-        try:
-            # Save uploaded file
-            async with aiofiles.open(file_path, 'wb') as f:
-                content = await file.read()
-                await f.write(content)
+        while True:
+            chunk = await file.read(self.chunk_size)
+            if not chunk:
+                break
             
-            # Process image (resize and optimize)
-            self._process_avatar_image(file_path)
+            if buffer.tell() == 0 and sniff_image_format(chunk) is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="File is not a supported image"
+                )
             
-            # Return relative URL path
-            return f"/uploads/avatars/{filename}"
+            buffer.write(chunk)
+            if buffer.tell() > self.max_file_size:
+                raise self._file_too_large()
             
+            # Dimensions usually sit in the first chunk; large EXIF blocks push them later
+            if not header_checked and buffer.tell() >= next_probe:
+                header_checked = self._check_image_header(buffer)
+                next_probe = max(buffer.tell(), self.chunk_size) * 2
+        
+        if buffer.tell() == 0 or (not header_checked and not self._check_image_header(buffer)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="File is not a valid image"
+            )
+        
+        return buffer.getvalue()
+
+    async def _store_avatar(self, processed: Dict[int, Dict[str, bytes]]) -> StoredAvatar:
+        """Write every processed variant under the hash of its bytes.
+
+        The returned avatar holds one reference to each blob; the caller
+        either points a user at it or hands it to ``release_avatar``.
+        """
+        extensions = {name: extension for name, _, extension, _ in AVATAR_FORMATS}
+        variants: Dict[str, Dict[str, str]] = {}
+        contents: Dict[str, bytes] = {}
+        
+        for size, encoded in processed.items():
+            variants[str(size)] = {}
+            for name, content in encoded.items():
+                filename = f"{hashlib.sha256(content).hexdigest()}.{extensions[name]}"
+                contents[filename] = content
+                variants[str(size)][name] = self.storage.public_url(filename)
+        
+        await self._retain_keys(set(contents))
+        try:
+            for filename, content in contents.items():
+                await self.storage.save(filename, content)
         except Exception as e:
-            # Clean up file if processing failed
-            if os.path.exists(file_path):
-                os.remove(file_path)
+            await self._release_keys(set(contents))
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Failed to process avatar: {str(e)}"
+                detail=f"Failed to save avatar: {str(e)}"
+            )
+        
+        # avatar_url keeps pointing at the default-size JPEG for existing clients
+        avatar_url = variants[str(self.avatar_size[0])]["jpeg"]
+        return StoredAvatar(url=avatar_url, variants=variants)
+
+    async def _process(self, content: bytes) -> Dict[int, Dict[str, bytes]]:
+        with observe(IMAGE_PROCESSING_LATENCY):
+            return await self.image_executor.run(
+                process_avatar_image,
+                content,
+                self.variant_sizes,
+                self.variant_formats
             )
 
-    def _process_avatar_image(self, file_path: str) -> None:
-        """Process avatar image - resize and optimize."""
+    async def save_avatar(self, file: UploadFile, user_id: int) -> StoredAvatar:
+        """Save and process avatar image."""
+        self._validate_image_file(file)
+        self.image_executor.check_capacity()
+        
+        content = await self._read_upload(file)
+        
         try:
-            with Image.open(file_path) as img:
-                # Convert to RGB if necessary (for PNG with transparency)
-                if img.mode in ('RGBA', 'LA', 'P'):
-                    # Create white background
-                    background = Image.new('RGB', img.size, (255, 255, 255))
-                    if img.mode == 'P':
-                        img = img.convert('RGBA')
-                    background.paste(img, mask=img.split()[-1] if img.mode == 'RGBA' else None)
-                    img = background
-                
-                # Resize image maintaining aspect ratio
-                img.thumbnail(self.avatar_size, Image.Resampling.LANCZOS)
-                
-                # Create square image with white background
-                square_img = Image.new('RGB', self.avatar_size, (255, 255, 255))
-                
-                # Center the image
-                x = (self.avatar_size[0] - img.width) // 2
-                y = (self.avatar_size[1] - img.height) // 2
-                square_img.paste(img, (x, y))
-                
-                # Save optimized image
-                square_img.save(file_path, 'JPEG', quality=85, optimize=True)
-                
+            # Process image (resize and optimize)
+            processed = await self._process(content)
+        except HTTPException:
+            raise
         except Exception as e:
-            raise Exception(f"Image processing failed: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=f"Failed to process avatar: {str(e)}"
+            )
+        
+        return await self._store_avatar(processed)
 
-    def delete_avatar(self, avatar_url: str) -> bool:
-        """Delete avatar file."""
-        if not avatar_url or not avatar_url.startswith("/uploads/avatars/"):
-            return False
+    async def submit_avatar_job(
+        self,
+        file: UploadFile,
+        on_complete: Callable[[StoredAvatar], Awaitable[Optional[StoredAvatar]]]
+    ) -> None:
+        """Accept an upload and process it in the background.
+
+        ``on_complete`` is awaited with the stored avatar once processing
+        succeeds and returns the avatar it replaced, which is then released.
+        """
+        self._validate_image_file(file)
+        self.image_executor.check_capacity()
         
-        # Extract filename from URL
-        filename = os.path.basename(avatar_url)
-        file_path = os.path.join(self.avatar_dir, filename)
+        content = await self._read_upload(file)
         
+        task = asyncio.create_task(self._run_avatar_job(content, on_complete))
+        self._jobs.add(task)
+        task.add_done_callback(self._jobs.discard)
+
+    async def _run_avatar_job(
+        self,
+        content: bytes,
+        on_complete: Callable[[StoredAvatar], Awaitable[Optional[StoredAvatar]]]
+    ) -> None:
         try:
-            if os.path.exists(file_path):
-                os.remove(file_path)
-                return True
+            processed = await self._process(content)
+            stored = await self._store_avatar(processed)
+            try:
+                replaced = await on_complete(stored)
+            except Exception:
+                # Nothing points at the new blobs, so drop the reference they were stored with
+                await self.release_avatar(stored.url, stored.variants)
+                raise
+            if replaced is not None:
+                await self.release_avatar(replaced.url, replaced.variants)
         except Exception:
-            pass
+            logger.exception("Avatar processing failed")
+
+    def select_variant(
+        self,
+        variants: Dict[str, Dict[str, str]],
+        size: int,
+        accept: str
+    ) -> Optional[str]:
+        """Pick the smallest variant covering ``size`` in the best format the client accepts."""
+        available = sorted(int(key) for key in variants)
+        if not available:
+            return None
+        chosen = next((s for s in available if s >= size), available[-1])
+        
+        accept = accept.lower()
+        by_format = variants[str(chosen)]
+        for name, _, _, _ in AVATAR_FORMATS:
+            if name in by_format and (name == "jpeg" or f"image/{name}" in accept):
+                return by_format[name]
+        return next(iter(by_format.values()), None)
+
+    def _avatar_keys(
+        self,
+        avatar_url: Optional[str],
+        avatar_variants: Optional[Dict[str, Dict[str, str]]]
+    ) -> Set[str]:
+        """Blob file names referenced by an avatar and its variants."""
+        urls = {avatar_url} if avatar_url else set()
+        for by_format in (avatar_variants or {}).values():
+            urls.update(by_format.values())
+        keys = (self.storage.key_from_url(url) for url in urls)
+        return {key for key in keys if key}
+
+    async def download_url(self, avatar_url: str) -> str:
+        """URL clients should fetch ``avatar_url`` from (presigned when configured)."""
+        key = self.storage.key_from_url(avatar_url)
+        if key is None:
+            return avatar_url
+        return await self.storage.download_url(key)
+
+    async def _retain_keys(self, keys: Set[str]) -> None:
+        """Add a reference to each blob and commit it before any file is written or reused.
+
+        With the reference held first, a concurrent release can no longer see
+        the blob as unreferenced and delete a file this upload is relying on.
+        """
+        if not keys:
+            return
+        
+        async with self.session_factory() as db:
+            if db.bind.dialect.name == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+            
+            stmt = insert(AvatarBlob).values([{"key": key, "ref_count": 1} for key in sorted(keys)])
+            await db.execute(stmt.on_conflict_do_update(
+                index_elements=[AvatarBlob.key],
+                set_={"ref_count": AvatarBlob.ref_count + 1}
+            ))
+            await db.commit()
+
+    async def release_avatar(
+        self,
+        avatar_url: Optional[str],
+        avatar_variants: Optional[Dict[str, Dict[str, str]]] = None
+    ) -> int:
+        """Drop a reference to each blob and delete files nobody references any more.
+
+        Returns the number of files removed.
+        """
+        return await self._release_keys(self._avatar_keys(avatar_url, avatar_variants))
+
+    async def _release_keys(self, keys: Set[str]) -> int:
+        if not keys:
+            return 0
+        
+        removed = 0
+        async with self.session_factory() as db:
+            result = await db.execute(
+                update(AvatarBlob)
+                .where(AvatarBlob.key.in_(sorted(keys)))
+                .values(ref_count=AvatarBlob.ref_count - 1)
+                .returning(AvatarBlob.key)
+            )
+            tracked = set(result.scalars().all())
+            await db.commit()
+            
+            for key in sorted(tracked):
+                # The row stays locked until the file is gone, so a concurrent
+                # _retain_keys waits, re-creates the row and rewrites the file
+                result = await db.execute(
+                    delete(AvatarBlob)
+                    .where(AvatarBlob.key == key, AvatarBlob.ref_count <= 0)
+                    .returning(AvatarBlob.key)
+                )
+                if result.scalar_one_or_none() is not None:
+                    try:
+                        await self.storage.delete(key)
+                    except Exception:
+                        await db.rollback()
+                        raise
+                    removed += 1
+                await db.commit()
         
-        return False
+        # Untracked uuid-named files predate content addressing and belong to one user
+        for key in keys - tracked:
+            if not CONTENT_ADDRESSED_KEY.match(key):
+                await self.storage.delete(key)
+                removed += 1
+        return removed
 
 # Global file upload service instance
-file_upload_service = FileUploadService()
\ No newline at end of file
+file_upload_service = FileUploadService()
@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.cache import TTLCache, get_redis
+from app.core.config import settings
+from app.models.user import OTPCode
+from app.utils.otp import hash_otp_code, otp_code_matches
+
+class OTPStore:
+    """Where issued OTP codes live until they are used or expire.
+
+    Only HMAC digests are stored. Issuing replaces any earlier code for the
+    same email and purpose; consuming succeeds at most once per code.
+    """
+
+    async def issue(self, db: AsyncSession, email: str, purpose: str, code: str, ttl: int) -> None:
+        """Store ``code``; database-backed stores leave the commit to the caller."""
+        raise NotImplementedError
+
+    async def consume(self, db: AsyncSession, email: str, purpose: str, code: str) -> bool:
+        """True if ``code`` is the live code, which is then used up."""
+        raise NotImplementedError
+
+    def _key(self, email: str, purpose: str) -> str:
+        return f"otp:{purpose}:{email.lower()}"
+
+class DatabaseOTPStore(OTPStore):
+    """Rows in otp_codes, cleaned up by the OTP sweeper."""
+
+    async def issue(self, db: AsyncSession, email: str, purpose: str, code: str, ttl: int) -> None:
+        # Replace any earlier code for this email and purpose
+        await db.execute(
+            delete(OTPCode).where(and_(OTPCode.email == email, OTPCode.purpose == purpose))
+        )
+        db.add(OTPCode(
+            email=email,
+            code_hash=hash_otp_code(email, purpose, code),
+            purpose=purpose,
+            expires_at=datetime.utcnow() + timedelta(seconds=ttl)
+        ))
+
+    async def consume(self, db: AsyncSession, email: str, purpose: str, code: str) -> bool:
+        # The digest is deterministic, so match and use up the code in one statement;
+        # of two concurrent requests only one can flip is_used
+        result = await db.execute(
+            update(OTPCode)
+            .where(
+                and_(
+                    OTPCode.email == email,
+                    OTPCode.purpose == purpose,
+                    OTPCode.code_hash == hash_otp_code(email, purpose, code),
+                    OTPCode.is_used == False,
+                    OTPCode.expires_at > datetime.utcnow()
+                )
+            )
+            .values(is_used=True)
+            .returning(OTPCode.id)
+        )
+        consumed = result.first() is not None
+        await db.commit()
+
+        return consumed
+
+class MemoryOTPStore(OTPStore):
+    """Per-process store for single-node deployments and tests."""
+
+    def __init__(self, max_entries: int = 100_000):
+        self._codes = TTLCache(max_entries=max_entries)
+
+    async def issue(self, db: AsyncSession, email: str, purpose: str, code: str, ttl: int) -> None:
+        self._codes.set(self._key(email, purpose), hash_otp_code(email, purpose, code), ttl)
+
+    async def consume(self, db: AsyncSession, email: str, purpose: str, code: str) -> bool:
+        key = self._key(email, purpose)
+        code_hash = self._codes.get(key)
+        if code_hash is None or not otp_code_matches(code_hash, email, purpose, code):
+            return False
+        # No await between the check and the delete, so this is atomic per process
+        self._codes.delete(key)
+        return True
+
+# Delete the key only if it still holds the submitted digest
+_CONSUME_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+class RedisOTPStore(OTPStore):
+    """Codes as Redis keys that expire by native TTL; shared by all workers.
+
+    The compare-and-delete runs as one Lua script. It compares keyed
+    digests, so its timing reveals nothing about the code itself.
+    """
+
+    def __init__(self):
+        self._consume = None
+
+    async def issue(self, db: AsyncSession, email: str, purpose: str, code: str, ttl: int) -> None:
+        await get_redis().set(self._key(email, purpose), hash_otp_code(email, purpose, code), ex=ttl)
+
+    async def consume(self, db: AsyncSession, email: str, purpose: str, code: str) -> bool:
+        if self._consume is None:
+            self._consume = get_redis().register_script(_CONSUME_SCRIPT)
+        deleted = await self._consume(
+            keys=[self._key(email, purpose)],
+            args=[hash_otp_code(email, purpose, code)]
+        )
+        return bool(deleted)
+
+def create_otp_store() -> OTPStore:
+    """Build the OTP store selected by ``OTP_STORE_BACKEND``."""
+    if settings.OTP_STORE_BACKEND == "database":
+        return DatabaseOTPStore()
+    if settings.OTP_STORE_BACKEND == "redis":
+        return RedisOTPStore()
+    if settings.OTP_STORE_BACKEND == "memory":
+        return MemoryOTPStore()
+    raise ValueError(f"Unknown OTP store backend: {settings.OTP_STORE_BACKEND}")
+
+# Global OTP store instance
+otp_store = create_otp_store()
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import delete, or_, select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models.user import OTPCode
+
+logger = logging.getLogger(__name__)
+
+class OTPSweeper:
+    """Background task that deletes expired and consumed OTP rows in batches.
+
+    Small batches with a commit each keep locks short; every API worker may
+    run one since the deletes are idempotent.
+    """
+
+    def __init__(self, session_factory=AsyncSessionLocal):
+        self.session_factory = session_factory
+        self.interval = settings.OTP_SWEEP_INTERVAL_SECONDS
+        self.batch_size = settings.OTP_SWEEP_BATCH_SIZE
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep_once(self) -> int:
+        """Delete every expired/used row, one batch per transaction; returns the count."""
+        deleted = 0
+        async with self.session_factory() as db:
+            while True:
+                doomed = (
+                    select(OTPCode.id)
+                    .where(or_(OTPCode.expires_at < datetime.utcnow(), OTPCode.is_used == True))
+                    .limit(self.batch_size)
+                    .scalar_subquery()
+                )
+                result = await db.execute(delete(OTPCode).where(OTPCode.id.in_(doomed)))
+                await db.commit()
+
+                deleted += result.rowcount
+                if result.rowcount < self.batch_size:
+                    return deleted
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                deleted = await self.sweep_once()
+                if deleted:
+                    logger.info("Swept expired/used OTP codes", extra={"deleted": deleted})
+            except Exception:
+                logger.exception("OTP sweep failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+# Global OTP sweeper instance
+otp_sweeper = OTPSweeper()
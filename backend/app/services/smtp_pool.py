@@ -0,0 +1,120 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.message import Message
+from typing import List, Tuple
+import aiosmtplib
+
+class SMTPConnectionPool:
+    """Pool of authenticated aiosmtplib connections reused across sends."""
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        size: int,
+        use_starttls: bool = True,
+        keepalive: float = 30,
+        timeout: float = 30
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = size
+        self.use_starttls = use_starttls
+        self.keepalive = keepalive
+        self.timeout = timeout
+        self._idle: List[Tuple[aiosmtplib.SMTP, float]] = []
+        self._slots = asyncio.Semaphore(size)
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        """Open and authenticate a new connection."""
+        if self.port == 465:
+            # Implicit TLS; some servers have certificate issues
+            client = aiosmtplib.SMTP(
+                hostname=self.host,
+                port=self.port,
+                use_tls=True,
+                validate_certs=False,
+                timeout=self.timeout
+            )
+            await client.connect()
+        else:
+            client = aiosmtplib.SMTP(
+                hostname=self.host,
+                port=self.port,
+                start_tls=False,
+                timeout=self.timeout
+            )
+            await client.connect()
+            if self.use_starttls:
+                await client.starttls(validate_certs=False)
+
+        if self.password:
+            await client.login(self.username, self.password)
+        return client
+
+    async def _close(self, client: aiosmtplib.SMTP) -> None:
+        try:
+            await client.quit()
+        except Exception:
+            client.close()
+
+    async def _is_alive(self, client: aiosmtplib.SMTP, last_used: float) -> bool:
+        """NOOP connections that sat idle long enough for the server to drop them."""
+        if not client.is_connected:
+            return False
+        if time.monotonic() - last_used < self.keepalive:
+            return True
+        try:
+            await client.noop()
+            return True
+        except Exception:
+            return False
+
+    async def acquire(self) -> aiosmtplib.SMTP:
+        await self._slots.acquire()
+        try:
+            while self._idle:
+                client, last_used = self._idle.pop()
+                if await self._is_alive(client, last_used):
+                    return client
+                client.close()
+            return await self._connect()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, client: aiosmtplib.SMTP, discard: bool = False) -> None:
+        try:
+            if discard or not client.is_connected:
+                client.close()
+            else:
+                self._idle.append((client, time.monotonic()))
+        finally:
+            self._slots.release()
+
+    @asynccontextmanager
+    async def connection(self):
+        """Borrow a connection; it is discarded if the block raises."""
+        client = await self.acquire()
+        try:
+            yield client
+        except BaseException:
+            await self.release(client, discard=True)
+            raise
+        else:
+            await self.release(client)
+
+    async def send_message(self, message: Message) -> None:
+        async with self.connection() as client:
+            await client.send_message(message)
+
+    async def close(self) -> None:
+        """Close all idle connections."""
+        idle, self._idle = self._idle, []
+        for client, _ in idle:
+            await self._close(client)
@@ -0,0 +1,187 @@
+import asyncio
+import mimetypes
+import os
+import uuid
+from typing import Optional
+import aiofiles
+from app.core.config import settings
+
+# Stored objects are content-addressed, so their bytes never change
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+class StorageBackend:
+    """Where avatar files live and how clients reach them.
+
+    Keys are flat file names; ``public_url`` is the stable URL stored on the
+    user row, ``download_url`` is what clients are redirected to.
+    """
+
+    async def save(self, key: str, content: bytes) -> bool:
+        """Store ``content`` under ``key`` unless it exists; True if written.
+
+        Callers must already hold an ``avatar_blobs`` reference to ``key`` so an
+        existing object cannot be garbage-collected after this check.
+        """
+        raise NotImplementedError
+
+    async def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def public_url(self, key: str) -> str:
+        raise NotImplementedError
+
+    def key_from_url(self, url: str) -> Optional[str]:
+        """Key for a URL produced by ``public_url``, or None if it is not ours."""
+        base = self.public_url("")
+        if url.startswith(base) and len(url) > len(base):
+            return url[len(base):]
+        return None
+
+    async def download_url(self, key: str) -> str:
+        return self.public_url(key)
+
+    async def close(self) -> None:
+        pass
+
+class LocalStorageBackend(StorageBackend):
+    """Files in a local directory served by the API under ``base_url``."""
+
+    def __init__(self, directory: str, base_url: str):
+        self.directory = directory
+        self.base_url = base_url.rstrip("/") + "/"
+        os.makedirs(self.directory, exist_ok=True)
+
+    async def save(self, key: str, content: bytes) -> bool:
+        file_path = os.path.join(self.directory, key)
+        if os.path.exists(file_path):
+            return False
+
+        # Write to a temp name first so readers never see a partial file
+        tmp_path = f"{file_path}.{uuid.uuid4().hex}.tmp"
+        async with aiofiles.open(tmp_path, 'wb') as f:
+            await f.write(content)
+        os.replace(tmp_path, file_path)
+        return True
+
+    async def delete(self, key: str) -> None:
+        try:
+            os.remove(os.path.join(self.directory, key))
+        except FileNotFoundError:
+            pass
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}{key}"
+
+class S3StorageBackend(StorageBackend):
+    """S3-compatible object store (AWS S3, MinIO, R2, ...).
+
+    boto3 is blocking, so calls run in worker threads. Clients fetch objects
+    straight from the store, either via ``public_base_url`` or presigned URLs.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region: Optional[str] = None,
+        access_key_id: Optional[str] = None,
+        secret_access_key: Optional[str] = None,
+        public_base_url: Optional[str] = None,
+        presign: bool = False,
+        presign_expires: int = 3600
+    ):
+        import boto3
+        from botocore.config import Config
+
+        self.bucket = bucket
+        self.prefix = prefix
+        self.presign = presign
+        self.presign_expires = presign_expires
+        self.client = boto3.client(
+            "s3",
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+            config=Config(max_pool_connections=20, retries={"max_attempts": 3})
+        )
+
+        if public_base_url:
+            self.base_url = public_base_url.rstrip("/") + "/"
+        elif endpoint_url:
+            self.base_url = f"{endpoint_url.rstrip('/')}/{bucket}/{prefix}"
+        else:
+            self.base_url = f"https://{bucket}.s3.{region or 'us-east-1'}.amazonaws.com/{prefix}"
+
+    def _object_key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object_key(key))
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+    def _save(self, key: str, content: bytes) -> bool:
+        if self._exists(key):
+            return False
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key),
+            Body=content,
+            ContentType=mimetypes.guess_type(key)[0] or "application/octet-stream",
+            CacheControl=IMMUTABLE_CACHE_CONTROL
+        )
+        return True
+
+    async def save(self, key: str, content: bytes) -> bool:
+        return await asyncio.to_thread(self._save, key, content)
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(
+            self.client.delete_object, Bucket=self.bucket, Key=self._object_key(key)
+        )
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}{key}"
+
+    async def download_url(self, key: str) -> str:
+        if not self.presign:
+            return self.public_url(key)
+        # Presigning is local HMAC work, no request is made
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self._object_key(key)},
+            ExpiresIn=self.presign_expires
+        )
+
+    async def close(self) -> None:
+        self.client.close()
+
+def create_storage_backend() -> StorageBackend:
+    """Build the avatar storage backend selected by STORAGE_BACKEND."""
+    if settings.STORAGE_BACKEND == "s3":
+        if not settings.S3_BUCKET:
+            raise ValueError("S3_BUCKET must be set when STORAGE_BACKEND=s3")
+        return S3StorageBackend(
+            bucket=settings.S3_BUCKET,
+            prefix=settings.S3_KEY_PREFIX,
+            endpoint_url=settings.S3_ENDPOINT_URL,
+            region=settings.S3_REGION,
+            access_key_id=settings.S3_ACCESS_KEY_ID,
+            secret_access_key=settings.S3_SECRET_ACCESS_KEY,
+            public_base_url=settings.S3_PUBLIC_BASE_URL,
+            presign=settings.S3_PRESIGN_URLS,
+            presign_expires=settings.S3_PRESIGN_EXPIRE_SECONDS
+        )
+    if settings.STORAGE_BACKEND != "local":
+        raise ValueError(f"Unknown storage backend: {settings.STORAGE_BACKEND}")
+    return LocalStorageBackend(
+        directory=os.path.join(settings.LOCAL_STORAGE_DIR, "avatars"),
+        base_url="/uploads/avatars"
+    )
@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import make_transient_to_detached
+from app.core.cache import CacheBackend, create_cache_backend
+from app.core.config import settings
+from app.models.user import User
+
+# Never copied into the cache (which may be Redis); read from the database when needed
+UNCACHED_COLUMNS = {"hashed_password"}
+
+class UserCache:
+    """Short-lived cache of user rows keyed by token subject (email).
+
+    Cached users leave ``UNCACHED_COLUMNS`` unloaded, so code that needs
+    them must select them explicitly rather than touch the attribute.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl: int):
+        self.backend = backend
+        self.ttl = ttl
+        self._columns = [column for column in User.__table__.columns if column.key not in UNCACHED_COLUMNS]
+
+    def _snapshot(self, user: User) -> dict:
+        data = {}
+        for column in self._columns:
+            value = getattr(user, column.key)
+            if isinstance(value, datetime):
+                value = value.isoformat()
+            data[column.key] = value
+        return data
+
+    def _restore(self, data: dict) -> User:
+        values = dict(data)
+        for column in self._columns:
+            if isinstance(column.type, DateTime) and values.get(column.key):
+                values[column.key] = datetime.fromisoformat(values[column.key])
+        return User(**values)
+
+    async def get(self, db: AsyncSession, email: str) -> Optional[User]:
+        """Return the cached user attached to ``db``, or None on a miss."""
+        if self.ttl <= 0:
+            return None
+
+        data = await self.backend.get(email)
+        if data is None:
+            return None
+
+        # Attach as a persistent, unmodified row so later updates flush normally
+        user = self._restore(data)
+        make_transient_to_detached(user)
+        return await db.merge(user, load=False)
+
+    async def set(self, user: User) -> None:
+        if self.ttl > 0:
+            await self.backend.set(user.email, self._snapshot(user), self.ttl)
+
+    async def invalidate(self, email: str) -> None:
+        await self.backend.delete(email)
+
+# Global user cache instance
+user_cache = UserCache(
+    backend=create_cache_backend("users", settings.USER_CACHE_MAX_ENTRIES),
+    ttl=settings.USER_CACHE_TTL_SECONDS
+)
@@ -1,12 +1,26 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
+from app.core.cache import TTLCache
 from app.core.config import settings
+from app.core.executors import BoundedExecutor
+from app.core.metrics import PASSWORD_HASH_LATENCY, observe
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow, so hashing runs in its own pool instead of on the event loop
+password_executor = BoundedExecutor(
+    name="password-hash",
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_QUEUE_SIZE,
+    kind=settings.PASSWORD_HASH_EXECUTOR,
+    retry_after=settings.PASSWORD_HASH_RETRY_AFTER_SECONDS
+)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a plain password against its hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -15,6 +29,16 @@ def get_password_hash(password: str) -> str:
     """Generate password hash."""
     return pwd_context.hash(password)
 
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in the hashing pool."""
+    with observe(PASSWORD_HASH_LATENCY, operation="verify"):
+        return await password_executor.run(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """Generate a password hash in the hashing pool."""
+    with observe(PASSWORD_HASH_LATENCY, operation="hash"):
+        return await password_executor.run(get_password_hash, password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create JWT access token."""
     to_encode = data.copy()
@@ -27,13 +51,47 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
-def verify_token(token: str) -> Optional[str]:
-    """Verify JWT token and return email if valid."""
+# Already-verified tokens (by SHA-256 digest) mapped to (claims, exp)
+token_cache = TTLCache(max_entries=max(settings.TOKEN_CACHE_MAX_ENTRIES, 1))
+
+def _decode_token_uncached(token: str) -> Optional[dict]:
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
-            return None
-        return email
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
     except JWTError:
-        return None
\ No newline at end of file
+        return None
+
+def decode_token(token: str) -> Optional[dict]:
+    """Decode and verify a JWT, reusing the result for tokens seen before."""
+    if settings.TOKEN_CACHE_MAX_ENTRIES <= 0:
+        return _decode_token_uncached(token)
+    
+    key = hashlib.sha256(token.encode()).digest()
+    now = int(time.time())
+    
+    cached = token_cache.get(key)
+    if cached is not None:
+        payload, exp = cached
+        # Same rule as jose: the token is valid up to and including its exp second
+        if now <= exp:
+            return payload
+        token_cache.delete(key)
+        return None
+    
+    payload = _decode_token_uncached(token)
+    if payload is None:
+        return None
+    
+    exp = payload.get("exp")
+    if isinstance(exp, int):
+        token_cache.set(key, (payload, exp), ttl=exp - now + 1)
+    return payload
+
+def verify_token(token: str) -> Optional[str]:
+    """Verify JWT token and return email if valid."""
+    payload = decode_token(token)
+    if payload is None:
+        return None
+    email: str = payload.get("sub")
+    if email is None:
+        return None
+    return email
\ No newline at end of file
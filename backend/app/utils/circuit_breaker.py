@@ -0,0 +1,68 @@
+import time
+from typing import Optional
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe.
+
+    closed: calls go through. After ``failure_threshold`` consecutive
+    failures it opens and calls are refused for ``reset_timeout`` seconds,
+    then one probe call is let through (half-open); its outcome closes or
+    re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self) -> Optional[str]:
+        """The state a call is admitted under, or None if it should not be attempted.
+
+        Returns ``CLOSED`` for ordinary calls and ``HALF_OPEN`` for the single
+        probe; pass it back to ``record_failure`` and ``release`` so only the
+        probe itself can free the probe slot.
+        """
+        state = self.state
+        if state == self.CLOSED:
+            return self.CLOSED
+        if state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return self.HALF_OPEN
+        return None
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self, admitted: Optional[str] = None) -> None:
+        self.failures += 1
+        probe = admitted == self.HALF_OPEN
+        if probe or self.failures >= self.failure_threshold:
+            self._opened_at = time.monotonic()
+        if probe:
+            self._probe_in_flight = False
+
+    def release(self, admitted: Optional[str]) -> None:
+        """Free the probe slot if ``admitted`` was the probe; call in a ``finally``.
+
+        A probe that is cancelled or raises before recording an outcome
+        would otherwise leave the circuit half-open and refusing every call.
+        Calls admitted while closed that finish late leave the slot alone.
+        """
+        if admitted == self.HALF_OPEN:
+            self._probe_in_flight = False
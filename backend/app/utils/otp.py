@@ -1,11 +1,22 @@
-import random
+import hashlib
+import hmac
+import secrets
 import string
 from datetime import datetime, timedelta
 from app.core.config import settings
 
 def generate_otp_code() -> str:
     """Generate a 6-digit OTP code."""
-    return ''.join(random.choices(string.digits, k=6))
+    return ''.join(secrets.choice(string.digits) for _ in range(6))
+
+def hash_otp_code(email: str, purpose: str, code: str) -> str:
+    """HMAC of an OTP code, bound to its email and purpose; only this is stored."""
+    message = f"{purpose}:{email.lower()}:{code}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+def otp_code_matches(code_hash: str, email: str, purpose: str, code: str) -> bool:
+    """Constant-time check of ``code`` against a stored hash."""
+    return hmac.compare_digest(code_hash, hash_otp_code(email, purpose, code))
 
 def get_otp_expiry() -> datetime:
     """Get OTP expiry time."""
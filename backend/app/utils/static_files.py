@@ -0,0 +1,37 @@
+import os
+import re
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+from app.services.storage import IMMUTABLE_CACHE_CONTROL
+
+# Avatar blobs are named after the SHA-256 of their bytes
+CONTENT_ADDRESSED_NAME = re.compile(r"^(?P<digest>[0-9a-f]{64})\.[a-z0-9]+$")
+
+class CachedStaticFiles(StaticFiles):
+    """Static files that mark content-addressed names as immutable.
+
+    A hashed file name can never change content, so browsers and CDNs may
+    keep it for a year and the digest doubles as a strong ETag.
+    """
+
+    def file_response(
+        self,
+        full_path: str,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        match = CONTENT_ADDRESSED_NAME.match(os.path.basename(full_path))
+        if match is None:
+            return super().file_response(full_path, stat_result, scope, status_code)
+
+        response = FileResponse(
+            full_path, status_code=status_code, stat_result=stat_result, method=scope["method"]
+        )
+        response.headers["etag"] = f'"{match.group("digest")}"'
+        response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Benchmark: JWT decode-per-request vs the verified-token cache.
+Usage (from backend/): python benchmarks/token_cache.py [iterations]
+"""
+
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SMTP_PASSWORD", "benchmark")
+
+from app.utils.auth import _decode_token_uncached, create_access_token, decode_token, token_cache
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    token = create_access_token(data={"sub": "bench@example.com"})
+
+    token_cache.clear()
+    decode_token(token)  # warm the cache
+
+    uncached = timeit.timeit(lambda: _decode_token_uncached(token), number=iterations)
+    cached = timeit.timeit(lambda: decode_token(token), number=iterations)
+
+    print(f"Iterations:         {iterations}")
+    print(f"jwt.decode:         {uncached / iterations * 1e6:8.2f} µs/request")
+    print(f"Cached lookup:      {cached / iterations * 1e6:8.2f} µs/request")
+    print(f"Speedup:            {uncached / cached:8.1f}x")
+
+if __name__ == "__main__":
+    main()
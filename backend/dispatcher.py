@@ -0,0 +1,22 @@
+import asyncio
+import logging
+import signal
+from app.core.logging import setup_logging
+from app.services.email_dispatcher import EmailDispatcher
+
+logger = logging.getLogger("dispatcher")
+
+async def main():
+    """Run the email outbox dispatcher until SIGINT/SIGTERM."""
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+    
+    logger.info("Email outbox dispatcher started")
+    await EmailDispatcher().run(stop_event)
+    logger.info("Email outbox dispatcher stopped")
+
+if __name__ == "__main__":
+    setup_logging()
+    asyncio.run(main())
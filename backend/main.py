@@ -1,14 +1,40 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
+from app.core.logging import setup_logging
 from app.routers import auth, users
-from app.core.database import engine
-from app.models import user
+from app.core.metrics import render_metrics
+from app.middleware.body_limit import BodySizeLimitMiddleware
+from app.middleware.metrics import MetricsMiddleware
+from app.middleware.rate_limit import RateLimitMiddleware
+from app.middleware.request_id import RequestIdMiddleware
+from app.core.database import async_engine, check_database, get_pool_status
+from app.services.email import email_service
+from app.services.file_upload import file_upload_service
+from app.services.otp_sweeper import otp_sweeper
+from app.utils.auth import password_executor
+from app.utils.static_files import CachedStaticFiles
+from sqlalchemy.engine import make_url
+from typing import Optional
+import hmac
+import logging
 import os
 
-# Create database tables
-user.Base.metadata.create_all(bind=engine)
+setup_logging()
+logger = logging.getLogger(__name__)
+
+logger.info(
+    "Configuration loaded",
+    extra={
+        "development_mode": settings.DEVELOPMENT_MODE,
+        "smtp_host": settings.SMTP_HOST,
+        "smtp_port": settings.SMTP_PORT,
+        "smtp_username": settings.SMTP_USERNAME,
+        "frontend_url": settings.FRONTEND_URL,
+        "database_url": make_url(settings.DATABASE_URL).render_as_string(hide_password=True),
+    }
+)
 
 app = FastAPI(
     title="Auth System API",
@@ -16,6 +42,13 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Body size caps sit innermost so every rejection still passes through CORS and metrics
+app.add_middleware(BodySizeLimitMiddleware)
+
+# Rate limiting (added before CORS so 429 responses still carry CORS headers)
+if settings.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -31,17 +64,39 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create uploads directory if it doesn't exist
-uploads_dir = "uploads"
-os.makedirs(uploads_dir, exist_ok=True)
+# Request metrics wrap everything else, so rejected requests are counted too
+app.add_middleware(MetricsMiddleware, router=app.router)
+
+# Outermost, so every log line written while serving a request carries its id
+app.add_middleware(RequestIdMiddleware)
 
-# Mount static files for serving uploaded files
-app.mount("/uploads", StaticFiles(directory=uploads_dir), name="uploads")
+# Serve uploaded files from the API only when they are stored locally;
+# object storage backends hand out their own URLs
+if settings.STORAGE_BACKEND == "local":
+    uploads_dir = settings.LOCAL_STORAGE_DIR
+    os.makedirs(uploads_dir, exist_ok=True)
+    app.mount("/uploads", CachedStaticFiles(directory=uploads_dir), name="uploads")
 
 # Include routers
 app.include_router(auth.router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(users.router, prefix="/api/users", tags=["Users"])
 
+@app.on_event("startup")
+async def start_background_services():
+    if settings.EMAIL_BACKGROUND_DELIVERY:
+        await email_service.start()
+    if settings.OTP_SWEEPER_ENABLED and settings.OTP_STORE_BACKEND == "database":
+        otp_sweeper.start()
+
+@app.on_event("shutdown")
+async def shutdown_resources():
+    await otp_sweeper.stop()
+    await email_service.stop()
+    password_executor.shutdown(wait=False)
+    file_upload_service.image_executor.shutdown(wait=False)
+    await file_upload_service.storage.close()
+    await async_engine.dispose()
+
 @app.get("/")
 async def root():
     return {"message": "Auth System API is running"}
@@ -49,3 +104,25 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+@app.get("/health/db")
+async def database_health_check():
+    pool = get_pool_status()
+    try:
+        latency_ms = await check_database()
+    except Exception:
+        # Driver errors can include hosts and DSNs; keep them in the logs only
+        logger.exception("Database health check failed")
+        return JSONResponse(status_code=503, content={"status": "unhealthy", "pool": pool})
+    return {"status": "healthy", "latency_ms": latency_ms, "pool": get_pool_status()}
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics(authorization: Optional[str] = Header(None)):
+    """Prometheus metrics for this worker (all workers when PROMETHEUS_MULTIPROC_DIR is set)."""
+    if settings.METRICS_TOKEN:
+        expected = f"Bearer {settings.METRICS_TOKEN}"
+        # Look like a missing route to anyone without the scrape token
+        if not hmac.compare_digest((authorization or "").encode(), expected.encode()):
+            return JSONResponse(status_code=404, content={"detail": "Not Found"})
+    body, content_type = render_metrics()
+    return Response(content=body, headers={"Content-Type": content_type})
@@ -0,0 +1,29 @@
+import logging
+import os
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+from app.core.database import engine
+from app.core.logging import setup_logging
+
+logger = logging.getLogger("migrate")
+
+# Revision matching the schema the app used to create with create_all at startup
+BASELINE_REVISION = "0001"
+
+def main():
+    """Bring the database schema up to date; run once per deploy, before the API starts."""
+    config = Config(os.path.join(os.path.dirname(os.path.abspath(__file__)), "alembic.ini"))
+    
+    # Databases created before migrations existed already hold the baseline tables
+    tables = set(inspect(engine).get_table_names())
+    if "users" in tables and "alembic_version" not in tables:
+        logger.info("Existing schema without migration history, stamping %s", BASELINE_REVISION)
+        command.stamp(config, BASELINE_REVISION)
+    
+    command.upgrade(config, "head")
+    logger.info("Database schema is up to date")
+
+if __name__ == "__main__":
+    setup_logging()
+    main()
@@ -0,0 +1,65 @@
+"""Baseline: users and otp_codes as created by the original create_all
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("username", sa.String(length=50), nullable=False),
+        sa.Column("email", sa.String(length=100), nullable=False),
+        sa.Column("hashed_password", sa.String(length=255), nullable=False),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_verified", sa.Boolean(), nullable=True),
+        sa.Column("failed_login_attempts", sa.Integer(), nullable=True),
+        sa.Column("locked_until", sa.DateTime(), nullable=True),
+        sa.Column("first_name", sa.String(length=50), nullable=True),
+        sa.Column("last_name", sa.String(length=50), nullable=True),
+        sa.Column("bio", sa.Text(), nullable=True),
+        sa.Column("phone", sa.String(length=20), nullable=True),
+        sa.Column("location", sa.String(length=100), nullable=True),
+        sa.Column("avatar_url", sa.String(length=255), nullable=True),
+        sa.Column("role", sa.String(length=20), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+
+    op.create_table(
+        "otp_codes",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(length=100), nullable=False),
+        sa.Column("code", sa.String(length=6), nullable=False),
+        sa.Column("purpose", sa.String(length=20), nullable=False),
+        sa.Column("expires_at", sa.DateTime(), nullable=False),
+        sa.Column("is_used", sa.Boolean(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_otp_codes_id", "otp_codes", ["id"])
+    op.create_index("ix_otp_codes_email", "otp_codes", ["email"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_otp_codes_email", table_name="otp_codes")
+    op.drop_index("ix_otp_codes_id", table_name="otp_codes")
+    op.drop_table("otp_codes")
+    op.drop_index("ix_users_email", table_name="users")
+    op.drop_index("ix_users_username", table_name="users")
+    op.drop_index("ix_users_id", table_name="users")
+    op.drop_table("users")
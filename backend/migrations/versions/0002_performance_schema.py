@@ -0,0 +1,121 @@
+"""Avatar variants/blobs, email outbox, and admin listing/search indexes
+
+Safe to run on databases left behind by pre-migration builds, which may
+already have some of these tables and indexes but never users.avatar_variants
+(see "Upgrading databases from pre-migration builds" in the README).
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:01
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+# (name, columns) of the keyset pagination indexes on users
+USER_LISTING_INDEXES = (
+    ("ix_users_created_at_id", ["created_at", "id"]),
+    ("ix_users_role_created_at_id", ["role", "created_at", "id"]),
+    ("ix_users_is_active_created_at_id", ["is_active", "created_at", "id"]),
+    ("ix_users_is_verified_created_at_id", ["is_verified", "created_at", "id"]),
+)
+
+TRIGRAM_COLUMNS = ("username", "email", "first_name", "last_name")
+
+
+def upgrade() -> None:
+    # Databases started by pre-migration builds already got some of this schema
+    # from create_all, so every step checks what exists first
+    bind = op.get_bind()
+    is_postgres = bind.dialect.name == "postgresql"
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    user_columns = {column["name"] for column in inspector.get_columns("users")}
+    user_indexes = {index["name"] for index in inspector.get_indexes("users")}
+
+    if "avatar_variants" not in user_columns:
+        with op.batch_alter_table("users") as batch_op:
+            batch_op.add_column(sa.Column("avatar_variants", sa.JSON(), nullable=True))
+
+    if "avatar_blobs" not in tables:
+        _create_avatar_blobs()
+    if "email_outbox" not in tables:
+        _create_email_outbox()
+    elif "text_body" not in {column["name"] for column in inspector.get_columns("email_outbox")}:
+        # Outbox tables from before plain-text alternatives were stored
+        with op.batch_alter_table("email_outbox") as batch_op:
+            batch_op.add_column(sa.Column("text_body", sa.Text(), nullable=True))
+
+    if not is_postgres:
+        for name, columns in USER_LISTING_INDEXES:
+            if name not in user_indexes:
+                op.create_index(name, "users", columns)
+        return
+
+    # users may already be large: build its indexes without blocking writes
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    with op.get_context().autocommit_block():
+        for name, columns in USER_LISTING_INDEXES:
+            op.create_index(name, "users", columns, postgresql_concurrently=True, if_not_exists=True)
+        for column in TRIGRAM_COLUMNS:
+            op.create_index(
+                f"ix_users_{column}_trgm",
+                "users",
+                [column],
+                postgresql_using="gin",
+                postgresql_ops={column: "gin_trgm_ops"},
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def _create_avatar_blobs() -> None:
+    op.create_table(
+        "avatar_blobs",
+        sa.Column("key", sa.String(length=100), nullable=False),
+        sa.Column("ref_count", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+
+def _create_email_outbox() -> None:
+    op.create_table(
+        "email_outbox",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("to_email", sa.String(length=100), nullable=False),
+        sa.Column("subject", sa.String(length=255), nullable=False),
+        sa.Column("html_body", sa.Text(), nullable=False),
+        sa.Column("text_body", sa.Text(), nullable=True),
+        sa.Column("status", sa.String(length=20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("available_at", sa.DateTime(), nullable=False),
+        sa.Column("locked_at", sa.DateTime(), nullable=True),
+        sa.Column("sent_at", sa.DateTime(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_email_outbox_id", "email_outbox", ["id"])
+    op.create_index("ix_email_outbox_status_available_at", "email_outbox", ["status", "available_at"])
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == "postgresql":
+        for column in TRIGRAM_COLUMNS:
+            op.drop_index(f"ix_users_{column}_trgm", table_name="users")
+    for name, _ in USER_LISTING_INDEXES:
+        op.drop_index(name, table_name="users")
+
+    op.drop_index("ix_email_outbox_status_available_at", table_name="email_outbox")
+    op.drop_index("ix_email_outbox_id", table_name="email_outbox")
+    op.drop_table("email_outbox")
+    op.drop_table("avatar_blobs")
+
+    with op.batch_alter_table("users") as batch_op:
+        batch_op.drop_column("avatar_variants")
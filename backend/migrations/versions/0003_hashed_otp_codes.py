@@ -0,0 +1,35 @@
+"""Store OTP codes as HMAC digests; index lookups and the expiry sweeper
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:02
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Plaintext codes cannot be converted and expire within minutes anyway
+    op.execute("DELETE FROM otp_codes")
+
+    with op.batch_alter_table("otp_codes") as batch_op:
+        batch_op.drop_column("code")
+        batch_op.add_column(sa.Column("code_hash", sa.String(length=64), nullable=False))
+        batch_op.create_index("ix_otp_codes_email_purpose_is_used", ["email", "purpose", "is_used"])
+        batch_op.create_index("ix_otp_codes_expires_at", ["expires_at"])
+
+
+def downgrade() -> None:
+    op.execute("DELETE FROM otp_codes")
+
+    with op.batch_alter_table("otp_codes") as batch_op:
+        batch_op.drop_index("ix_otp_codes_expires_at")
+        batch_op.drop_index("ix_otp_codes_email_purpose_is_used")
+        batch_op.drop_column("code_hash")
+        batch_op.add_column(sa.Column("code", sa.String(length=6), nullable=False))
@@ -0,0 +1,81 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point everything at throwaway local state first
+_TMP_DIR = tempfile.mkdtemp(prefix="auth-tests-")
+os.environ.update({
+    "DATABASE_URL": f"sqlite:///{_TMP_DIR}/test.db",
+    "SMTP_PASSWORD": "test",
+    "DEVELOPMENT_MODE": "true",
+    "LOCAL_STORAGE_DIR": os.path.join(_TMP_DIR, "uploads"),
+    "AVATAR_PROCESSING_EXECUTOR": "thread",
+    "CACHE_BACKEND": "memory",
+    "USER_CACHE_TTL_SECONDS": "0",
+    "OTP_STORE_BACKEND": "database",
+    "OTP_SWEEPER_ENABLED": "false",
+    "RATE_LIMIT_ENABLED": "false",
+    "EMAIL_BACKGROUND_DELIVERY": "false",
+    "LOG_LEVEL": "WARNING",
+})
+
+import pytest
+from sqlalchemy import text
+from app.core.database import AsyncSessionLocal, engine
+import migrate
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+@pytest.fixture(scope="session", autouse=True)
+def migrated_database():
+    migrate.main()
+
+@pytest.fixture(autouse=True)
+def clean_tables():
+    with engine.begin() as conn:
+        for table in ("otp_codes", "avatar_blobs", "email_outbox", "users"):
+            conn.execute(text(f"DELETE FROM {table}"))
+    yield
+
+@pytest.fixture
+def session_factory():
+    return AsyncSessionLocal
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    import main
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+@pytest.fixture
+def admin_headers():
+    from app.utils.auth import create_access_token, get_password_hash
+    with engine.begin() as conn:
+        conn.execute(
+            text(
+                "INSERT INTO users (username, email, hashed_password, role, is_active, is_verified, failed_login_attempts) "
+                "VALUES ('admin', 'admin@example.com', :password, 'admin', 1, 1, 0)"
+            ),
+            {"password": get_password_hash("password123")}
+        )
+    return {"Authorization": f"Bearer {create_access_token({'sub': 'admin@example.com'})}"}
+
+@pytest.fixture
+def users():
+    rows = [
+        {"username": "=HYPERLINK(\"http://evil\")", "email": "formula@example.com", "first_name": "+1", "last_name": "@SUM(A1)"},
+        {"username": "plain", "email": "plain@example.com", "first_name": "Ann", "last_name": "Lee"},
+    ]
+    with engine.begin() as conn:
+        for row in rows:
+            conn.execute(
+                text(
+                    "INSERT INTO users (username, email, hashed_password, role, is_active, is_verified, "
+                    "failed_login_attempts, first_name, last_name) "
+                    "VALUES (:username, :email, 'x', 'user', 1, 1, 0, :first_name, :last_name)"
+                ),
+                row
+            )
+    return rows
@@ -0,0 +1,27 @@
+import csv
+import io
+import json
+import pytest
+from app.services.admin_users import csv_safe
+
+@pytest.mark.parametrize("value", ["=1+1", "+1", "-1", "@cmd", "\tx", "\rx"])
+def test_csv_safe_quotes_formula_prefixes(value):
+    assert csv_safe(value) == "'" + value
+
+def test_csv_safe_leaves_other_values_alone():
+    assert [csv_safe(value) for value in ("alice", "a-b", 3, None, True)] == ["alice", "a-b", 3, None, True]
+
+def test_csv_export_neutralises_formulas(client, admin_headers, users):
+    response = client.get("/api/users/admin/users/export", headers=admin_headers)
+
+    rows = {row["email"]: row for row in csv.DictReader(io.StringIO(response.text))}
+    assert rows["formula@example.com"]["username"] == "'=HYPERLINK(\"http://evil\")"
+    assert rows["formula@example.com"]["first_name"] == "'+1"
+    assert rows["formula@example.com"]["last_name"] == "'@SUM(A1)"
+    assert rows["plain@example.com"]["username"] == "plain"
+
+def test_ndjson_export_keeps_values_verbatim(client, admin_headers, users):
+    response = client.get("/api/users/admin/users/export", headers=admin_headers, params={"format": "ndjson"})
+
+    rows = {row["email"]: row for row in map(json.loads, response.text.splitlines())}
+    assert rows["formula@example.com"]["username"] == "=HYPERLINK(\"http://evil\")"
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import text
+from app.core.database import engine
+from app.services.admin_users import AdminUserService
+
+def test_bulk_update_rejects_an_unconfirmed_empty_filter(client, admin_headers, users):
+    response = client.post("/api/users/admin/users/bulk", headers=admin_headers, json={"filter": {}, "is_active": False})
+
+    assert response.status_code == 422
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT COUNT(*) FROM users WHERE is_active = 0")).scalar() == 0
+
+def test_bulk_update_with_confirm_all_reports_counts(client, admin_headers, users):
+    response = client.post(
+        "/api/users/admin/users/bulk",
+        headers=admin_headers,
+        json={"filter": {}, "confirm_all": True, "is_active": False}
+    )
+
+    body = response.json()
+    assert response.status_code == 200
+    assert (body["updated"], body["skipped"], body["not_found"]) == (len(users), 1, 0)
+    assert [result["status"] for result in body["results"]] == ["skipped"]
+
+def test_bulk_update_lists_only_unchanged_users(client, admin_headers, users):
+    response = client.post(
+        "/api/users/admin/users/bulk",
+        headers=admin_headers,
+        json={"user_ids": [999999], "role": "moderator"}
+    )
+
+    assert response.json()["results"] == [{"id": 999999, "status": "not_found", "detail": None}]
+
+def _walk_pages(client, headers, sort, limit=3):
+    ids, cursor = [], None
+    for _ in range(20):
+        params = {"sort": sort, "limit": limit}
+        if cursor:
+            params["cursor"] = cursor
+        body = client.get("/api/users/admin/users", headers=headers, params=params).json()
+        ids.extend(item["id"] for item in body["items"])
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return ids
+    raise AssertionError(f"pagination for {sort} did not terminate: {ids}")
+
+@pytest.mark.parametrize("sort", ["-created_at", "created_at", "username", "-username"])
+def test_list_users_pages_through_every_user_once(client, admin_headers, sort):
+    # Rows created within the same second share a created_at, so the id tiebreak decides
+    with engine.begin() as conn:
+        for n in range(7):
+            conn.execute(
+                text(
+                    "INSERT INTO users (username, email, hashed_password, role, is_active, is_verified, failed_login_attempts) "
+                    "VALUES (:username, :email, 'x', 'user', 1, 1, 0)"
+                ),
+                {"username": f"user{n}", "email": f"user{n}@example.com"}
+            )
+        rows = conn.execute(text("SELECT id, username FROM users")).all()
+
+    by_id = sorted(id_ for id_, _ in rows)
+    by_username = [id_ for id_, _ in sorted(rows, key=lambda row: row.username)]
+    expected = {
+        "-created_at": by_id[::-1],
+        "created_at": by_id,
+        "username": by_username,
+        "-username": by_username[::-1],
+    }[sort]
+
+    assert _walk_pages(client, admin_headers, sort) == expected
+
+def test_bulk_update_caps_the_reported_results(client, admin_headers, monkeypatch):
+    init = AdminUserService.__init__
+
+    def small_report(self, db):
+        init(self, db)
+        self.bulk_max_reported = 2
+
+    monkeypatch.setattr(AdminUserService, "__init__", small_report)
+    response = client.post(
+        "/api/users/admin/users/bulk",
+        headers=admin_headers,
+        json={"user_ids": [999991, 999992, 999993], "role": "moderator"}
+    )
+
+    body = response.json()
+    assert body["not_found"] == 3
+    assert len(body["results"]) == 2
+    assert body["results_truncated"] is True
@@ -0,0 +1,99 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, select, update
+import app.services.auth as auth_module
+from app.core.config import settings
+from app.core.database import async_engine
+from app.models.user import User
+from app.schemas.user import UserCreate
+from app.services.auth import AuthService
+
+pytestmark = pytest.mark.anyio
+
+PASSWORD = "password123"
+
+@pytest.fixture
+async def user(session_factory):
+    async with session_factory() as db:
+        return await AuthService(db).create_user(
+            UserCreate(username="bob", email="bob@example.com", password=PASSWORD)
+        )
+
+async def attempt(session_factory, password):
+    async with session_factory() as db:
+        return await AuthService(db).authenticate_user("bob", password) is not None
+
+async def login_state(session_factory):
+    async with session_factory() as db:
+        result = await db.execute(
+            select(User.failed_login_attempts, User.locked_until).where(User.username == "bob")
+        )
+        return result.one()
+
+async def test_locks_after_max_attempts(session_factory, user):
+    for _ in range(settings.MAX_LOGIN_ATTEMPTS):
+        assert not await attempt(session_factory, "wrong")
+
+    attempts, locked_until = await login_state(session_factory)
+    assert attempts == settings.MAX_LOGIN_ATTEMPTS
+    assert locked_until > datetime.utcnow()
+    assert not await attempt(session_factory, PASSWORD)
+
+async def test_success_clears_failures(session_factory, user):
+    assert not await attempt(session_factory, "wrong")
+    assert await attempt(session_factory, PASSWORD)
+    assert tuple(await login_state(session_factory)) == (0, None)
+
+async def test_expired_lockout_starts_a_fresh_count(session_factory, user):
+    async with session_factory() as db:
+        await db.execute(
+            update(User)
+            .where(User.id == user.id)
+            .values(failed_login_attempts=settings.MAX_LOGIN_ATTEMPTS, locked_until=datetime.utcnow() - timedelta(minutes=1))
+        )
+        await db.commit()
+
+    assert not await attempt(session_factory, "wrong")
+    assert tuple(await login_state(session_factory)) == (1, None)
+
+async def test_parallel_failures_are_all_counted(session_factory, user):
+    results = await asyncio.gather(*(attempt(session_factory, "wrong") for _ in range(settings.MAX_LOGIN_ATTEMPTS + 3)))
+
+    assert not any(results)
+    attempts, locked_until = await login_state(session_factory)
+    assert attempts == settings.MAX_LOGIN_ATTEMPTS
+    assert locked_until is not None
+
+async def test_correct_guess_fails_if_parallel_guesses_locked_the_account(session_factory, user, monkeypatch):
+    verify = auth_module.verify_password_async
+
+    async def slow_correct_password(password, hashed_password):
+        # The correct guess finishes bcrypt only after the wrong ones have locked the account
+        if password == PASSWORD:
+            await asyncio.sleep(1)
+        return await verify(password, hashed_password)
+
+    monkeypatch.setattr(auth_module, "verify_password_async", slow_correct_password)
+    results = await asyncio.gather(
+        attempt(session_factory, PASSWORD),
+        *(attempt(session_factory, "wrong") for _ in range(settings.MAX_LOGIN_ATTEMPTS))
+    )
+
+    assert not any(results)
+    _, locked_until = await login_state(session_factory)
+    assert locked_until > datetime.utcnow()
+
+async def test_clean_success_does_not_write(session_factory, user):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.lstrip().split()[0].upper())
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        assert await attempt(session_factory, PASSWORD)
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    assert statements and set(statements) == {"SELECT"}
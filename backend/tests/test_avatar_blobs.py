@@ -0,0 +1,109 @@
+import asyncio
+import io
+import os
+import pytest
+from PIL import Image
+from sqlalchemy import select
+from app.models.user import AvatarBlob
+from app.services.file_upload import file_upload_service
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture(autouse=True)
+def empty_storage():
+    directory = file_upload_service.storage.directory
+    for name in os.listdir(directory):
+        os.remove(os.path.join(directory, name))
+
+@pytest.fixture(scope="module")
+def image_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (300, 300), (40, 90, 160)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+@pytest.fixture
+async def processed(image_bytes):
+    return await file_upload_service._process(image_bytes)
+
+def stored_files(stored):
+    keys = file_upload_service._avatar_keys(stored.url, stored.variants)
+    directory = file_upload_service.storage.directory
+    return {key: os.path.exists(os.path.join(directory, key)) for key in keys}
+
+async def ref_counts(session_factory):
+    async with session_factory() as db:
+        result = await db.execute(select(AvatarBlob.key, AvatarBlob.ref_count))
+        return dict(result.all())
+
+async def test_shared_blobs_are_deleted_with_the_last_reference(session_factory, processed):
+    first = await file_upload_service._store_avatar(processed)
+    second = await file_upload_service._store_avatar(processed)
+    assert set((await ref_counts(session_factory)).values()) == {2}
+
+    assert await file_upload_service.release_avatar(first.url, first.variants) == 0
+    assert all(stored_files(second).values())
+
+    removed = await file_upload_service.release_avatar(second.url, second.variants)
+    assert removed == len(stored_files(second))
+    assert not any(stored_files(second).values())
+    assert await ref_counts(session_factory) == {}
+
+async def test_reupload_during_release_keeps_its_files(session_factory, processed, monkeypatch):
+    first = await file_upload_service._store_avatar(processed)
+    storage = file_upload_service.storage
+    delete = storage.delete
+    deleting = asyncio.Event()
+
+    async def slow_delete(key):
+        # Hold the release between dropping the reference and removing the file
+        deleting.set()
+        await asyncio.sleep(0.2)
+        await delete(key)
+
+    monkeypatch.setattr(storage, "delete", slow_delete)
+    release = asyncio.create_task(file_upload_service.release_avatar(first.url, first.variants))
+    await deleting.wait()
+    second = await file_upload_service._store_avatar(processed)
+    await release
+    monkeypatch.setattr(storage, "delete", delete)
+
+    assert all(stored_files(second).values())
+    assert set((await ref_counts(session_factory)).values()) == {1}
+
+async def test_failed_background_job_releases_its_blobs(session_factory, image_bytes):
+    async def on_complete(stored):
+        raise RuntimeError("profile update failed")
+
+    await file_upload_service._run_avatar_job(image_bytes, on_complete)
+
+    assert await ref_counts(session_factory) == {}
+    assert os.listdir(file_upload_service.storage.directory) == []
+
+async def test_background_job_releases_the_replaced_avatar(session_factory, processed, image_bytes):
+    previous = await file_upload_service._store_avatar(processed)
+    other = io.BytesIO()
+    Image.new("RGB", (300, 300), (200, 30, 30)).save(other, "PNG")
+    applied = []
+
+    async def on_complete(stored):
+        applied.append(stored)
+        return previous
+
+    await file_upload_service._run_avatar_job(other.getvalue(), on_complete)
+
+    assert not any(stored_files(previous).values())
+    assert all(stored_files(applied[0]).values())
+
+async def test_untracked_files_are_deleted_only_if_they_predate_content_addressing(session_factory):
+    storage = file_upload_service.storage
+    legacy = "30dc59e6-6e7d-445d-b245-0a4123adf2b1.jpg"
+    orphan = "ab" * 32 + ".webp"
+    for key in (legacy, orphan):
+        with open(os.path.join(storage.directory, key), "wb") as f:
+            f.write(b"x")
+
+    # An untracked content-addressed file may be mid-upload by someone else, so it stays
+    assert await file_upload_service.release_avatar(storage.public_url(legacy)) == 1
+    assert await file_upload_service.release_avatar(storage.public_url(orphan)) == 0
+    assert not os.path.exists(os.path.join(storage.directory, legacy))
+    assert os.path.exists(os.path.join(storage.directory, orphan))
@@ -0,0 +1,65 @@
+import io
+import os
+from PIL import Image
+from app.core.config import settings
+
+def png_bytes():
+    buffer = io.BytesIO()
+    Image.new("RGB", (64, 64), (1, 2, 3)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def test_declared_oversized_upload_is_rejected(client, admin_headers):
+    content = png_bytes() + os.urandom(settings.AVATAR_MAX_FILE_SIZE + 128 * 1024)
+    response = client.post(
+        "/api/users/upload-avatar",
+        headers=admin_headers,
+        files={"file": ("avatar.png", content, "image/png")}
+    )
+
+    assert response.status_code == 413
+
+def test_chunked_oversized_upload_is_rejected(client, admin_headers):
+    def body():
+        yield b'--b\r\nContent-Disposition: form-data; name="file"; filename="avatar.png"\r\nContent-Type: image/png\r\n\r\n'
+        yield png_bytes()
+        for _ in range(settings.AVATAR_MAX_FILE_SIZE // (64 * 1024) + 2):
+            yield os.urandom(64 * 1024)
+        yield b"\r\n--b--\r\n"
+
+    response = client.post(
+        "/api/users/upload-avatar",
+        headers={**admin_headers, "Content-Type": "multipart/form-data; boundary=b"},
+        content=body()
+    )
+
+    assert response.status_code == 413
+
+def test_other_routes_use_the_default_limit(client, admin_headers):
+    response = client.put(
+        "/api/users/profile",
+        headers={**admin_headers, "Content-Type": "application/json"},
+        content=b"{" + b" " * settings.MAX_REQUEST_BODY_BYTES + b"}"
+    )
+
+    assert response.status_code == 413
+
+def test_non_image_upload_is_rejected_from_the_first_chunk(client, admin_headers):
+    response = client.post(
+        "/api/users/upload-avatar",
+        headers=admin_headers,
+        files={"file": ("avatar.png", b"not an image" * 100, "image/png")}
+    )
+
+    assert response.status_code == 400
+
+def test_upload_at_the_file_size_cap_fits_the_body_limit(client, admin_headers):
+    image = png_bytes()
+    # Trailing bytes after IEND are ignored by decoders, so this is still a valid PNG
+    content = image + b"\0" * (settings.AVATAR_MAX_FILE_SIZE - len(image))
+    response = client.post(
+        "/api/users/upload-avatar",
+        headers=admin_headers,
+        files={"file": ("avatar.png", content, "image/png")}
+    )
+
+    assert response.status_code == 200
@@ -0,0 +1,54 @@
+import time
+from app.utils.circuit_breaker import CircuitBreaker
+
+def open_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    for _ in range(2):
+        admitted = breaker.allow_request()
+        assert admitted == CircuitBreaker.CLOSED
+        breaker.record_failure(admitted)
+    return breaker
+
+def test_opens_after_threshold_and_allows_one_probe():
+    breaker = open_breaker()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+    time.sleep(0.06)
+    assert breaker.allow_request() == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() is None
+
+def test_probe_outcome_closes_or_reopens():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    breaker.record_failure(breaker.allow_request())
+    assert breaker.state == CircuitBreaker.OPEN
+
+    time.sleep(0.06)
+    breaker.allow_request()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+def test_abandoned_probe_frees_the_slot():
+    breaker = open_breaker()
+    time.sleep(0.06)
+    probe = breaker.allow_request()
+
+    # e.g. the probe was cancelled before recording an outcome
+    breaker.release(probe)
+
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request() == CircuitBreaker.HALF_OPEN
+
+def test_late_closed_call_does_not_free_the_probe_slot():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    slow = breaker.allow_request()
+    breaker.record_failure(breaker.allow_request())
+    breaker.record_failure(breaker.allow_request())
+    time.sleep(0.06)
+    assert breaker.allow_request() == CircuitBreaker.HALF_OPEN
+
+    # A send admitted while closed finishes during the probe
+    breaker.release(slow)
+
+    assert breaker.allow_request() is None
@@ -0,0 +1,84 @@
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import select, update
+from app.core.config import settings
+from app.models.user import EmailOutbox
+from app.services.email_dispatcher import EmailDispatcher
+
+pytestmark = pytest.mark.anyio
+
+async def enqueue(session_factory, count, **values):
+    async with session_factory() as db:
+        for i in range(count):
+            db.add(EmailOutbox(to_email=f"user{i}@example.com", subject="Hi", html_body="<p>Hi</p>", **values))
+        await db.commit()
+
+async def test_claimed_rows_are_not_claimed_again(session_factory):
+    await enqueue(session_factory, 3)
+    dispatcher = EmailDispatcher(session_factory)
+
+    first = await dispatcher.claim_batch()
+    second = await dispatcher.claim_batch()
+
+    assert len(first) == 3
+    assert second == []
+    assert {row.status for row in first} == {"sending"}
+
+async def test_rows_are_claimed_only_once_due(session_factory):
+    await enqueue(session_factory, 1, available_at=datetime.utcnow() + timedelta(minutes=5))
+
+    assert await EmailDispatcher(session_factory).claim_batch() == []
+
+async def test_stale_leases_are_reclaimed(session_factory):
+    await enqueue(session_factory, 1)
+    dispatcher = EmailDispatcher(session_factory)
+    [row] = await dispatcher.claim_batch()
+
+    async with session_factory() as db:
+        await db.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.id == row.id)
+            .values(locked_at=datetime.utcnow() - dispatcher.lease - timedelta(seconds=1))
+        )
+        await db.commit()
+
+    [reclaimed] = await dispatcher.claim_batch()
+    assert reclaimed.id == row.id
+    assert reclaimed.attempts == 2
+
+async def test_delivered_rows_are_marked_sent(session_factory):
+    await enqueue(session_factory, 2)
+
+    assert await EmailDispatcher(session_factory).run_once() == 2
+
+    async with session_factory() as db:
+        statuses = (await db.execute(select(EmailOutbox.status))).scalars().all()
+    assert statuses == ["sent", "sent"]
+
+async def test_failed_sends_back_off_then_give_up(session_factory, monkeypatch):
+    import app.services.email_dispatcher as dispatcher_module
+
+    async def refuse(*args, **kwargs):
+        return False
+
+    monkeypatch.setattr(dispatcher_module.email_service, "send_email", refuse)
+    await enqueue(session_factory, 1)
+    dispatcher = EmailDispatcher(session_factory)
+
+    assert await dispatcher.run_once() == 1
+    async with session_factory() as db:
+        row = (await db.execute(select(EmailOutbox))).scalar_one()
+    assert (row.status, row.last_error) == ("pending", "SMTP delivery failed")
+    assert row.available_at > datetime.utcnow()
+
+    # Later attempts are due immediately once the backoff is zero
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BACKOFF_SECONDS", 0)
+    async with session_factory() as db:
+        await db.execute(update(EmailOutbox).values(available_at=datetime.utcnow()))
+        await db.commit()
+    while await dispatcher.run_once():
+        pass
+
+    async with session_factory() as db:
+        row = (await db.execute(select(EmailOutbox))).scalar_one()
+    assert (row.status, row.attempts) == ("failed", settings.EMAIL_MAX_RETRIES + 1)
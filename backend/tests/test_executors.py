@@ -0,0 +1,58 @@
+import asyncio
+import threading
+import pytest
+from fastapi import HTTPException
+from app.core.executors import BoundedExecutor
+from app.utils.auth import password_executor
+
+pytestmark = pytest.mark.anyio
+
+@pytest.fixture
+def release():
+    return threading.Event()
+
+@pytest.fixture
+def executor(release):
+    pool = BoundedExecutor("test-pool", max_workers=1, max_queue=1, retry_after=7)
+    yield pool
+    release.set()
+    pool.shutdown(wait=True)
+
+async def test_rejects_calls_beyond_capacity_with_retry_after(executor, release):
+    jobs = [asyncio.create_task(executor.run(release.wait)) for _ in range(executor.capacity)]
+    await asyncio.sleep(0.05)
+
+    with pytest.raises(HTTPException) as excinfo:
+        await executor.run(release.wait)
+    assert excinfo.value.status_code == 503
+    assert excinfo.value.headers == {"Retry-After": "7"}
+
+    release.set()
+    await asyncio.gather(*jobs)
+    assert executor.in_flight == 0
+
+async def test_cancelled_callers_keep_their_slot_until_the_job_finishes(executor, release):
+    running = asyncio.create_task(executor.run(release.wait))
+    queued = asyncio.create_task(executor.run(release.wait))
+    await asyncio.sleep(0.05)
+
+    running.cancel()
+    queued.cancel()
+    await asyncio.gather(running, queued, return_exceptions=True)
+
+    # The queued job never starts and frees its slot; the running one is still using a worker
+    assert executor.in_flight == 1
+    release.set()
+    for _ in range(50):
+        if executor.in_flight == 0:
+            break
+        await asyncio.sleep(0.01)
+    assert executor.in_flight == 0
+
+def test_login_returns_503_when_the_password_pool_is_full(client, admin_headers, monkeypatch):
+    monkeypatch.setattr(password_executor, "_in_flight", password_executor.capacity)
+
+    response = client.post("/api/auth/login", json={"username": "admin", "password": "password123"})
+
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == str(password_executor.retry_after)
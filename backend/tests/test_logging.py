@@ -0,0 +1,37 @@
+import logging
+import queue
+import time
+from app.core.logging import NonBlockingQueueHandler
+
+def _record(level: int) -> logging.LogRecord:
+    return logging.LogRecord("test", level, __file__, 0, "message", None, None)
+
+def test_full_queue_drops_without_blocking_and_keeps_room_for_warnings():
+    log_queue: queue.Queue = queue.Queue(maxsize=3)
+    handler = NonBlockingQueueHandler(log_queue, reserved=1)
+
+    for _ in range(3):
+        handler.emit(_record(logging.INFO))
+    assert log_queue.qsize() == 2  # the last slot is held back for warnings
+
+    handler.emit(_record(logging.ERROR))
+    started = time.monotonic()
+    handler.emit(_record(logging.ERROR))
+    assert time.monotonic() - started < 0.1
+    assert log_queue.qsize() == 3
+    assert handler.dropped == 2
+
+def test_drops_are_reported_once_the_queue_has_room():
+    log_queue: queue.Queue = queue.Queue(maxsize=2)
+    handler = NonBlockingQueueHandler(log_queue)
+
+    for _ in range(3):
+        handler.emit(_record(logging.INFO))
+    log_queue.get_nowait()
+    log_queue.get_nowait()
+    handler.emit(_record(logging.INFO))
+
+    log_queue.get_nowait()
+    notice = log_queue.get_nowait()
+    assert notice.getMessage() == "Log queue was full; records were dropped"
+    assert notice.dropped == 1
@@ -0,0 +1,15 @@
+from app.core.config import settings
+
+def test_metrics_open_without_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", None)
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert "http_requests_in_flight" in response.text
+
+def test_metrics_require_scrape_token(client, monkeypatch):
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-secret")
+
+    assert client.get("/metrics").status_code == 404
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 404
+    response = client.get("/metrics", headers={"Authorization": "Bearer scrape-secret"})
+    assert response.status_code == 200
@@ -0,0 +1,109 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event, select, update
+from app.core.database import async_engine
+from app.models.user import OTPCode
+from app.core.config import settings
+from app.services.otp_store import DatabaseOTPStore, MemoryOTPStore, RedisOTPStore, create_otp_store
+
+pytestmark = pytest.mark.anyio
+
+EMAIL = "otp@example.com"
+PURPOSE = "password_reset"
+
+@pytest.fixture(params=["database", "memory", "redis"])
+def store(request, monkeypatch):
+    if request.param == "database":
+        return DatabaseOTPStore()
+    if request.param == "memory":
+        return MemoryOTPStore()
+
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    import app.services.otp_store as otp_store_module
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(otp_store_module, "get_redis", lambda: client)
+    return RedisOTPStore()
+
+async def issue(store, session_factory, code, ttl=600):
+    async with session_factory() as db:
+        await store.issue(db, EMAIL, PURPOSE, code, ttl)
+        await db.commit()
+
+async def consume(store, session_factory, code, purpose=PURPOSE):
+    async with session_factory() as db:
+        return await store.consume(db, EMAIL, purpose, code)
+
+async def test_code_is_single_use(store, session_factory):
+    await issue(store, session_factory, "123456")
+
+    assert await consume(store, session_factory, "123456")
+    assert not await consume(store, session_factory, "123456")
+
+async def test_wrong_code_or_purpose_is_rejected_without_using_the_code(store, session_factory):
+    await issue(store, session_factory, "123456")
+
+    assert not await consume(store, session_factory, "654321")
+    assert not await consume(store, session_factory, "123456", purpose="registration")
+    assert await consume(store, session_factory, "123456")
+
+async def test_reissue_replaces_the_previous_code(store, session_factory):
+    await issue(store, session_factory, "111111")
+    await issue(store, session_factory, "222222")
+
+    assert not await consume(store, session_factory, "111111")
+    assert await consume(store, session_factory, "222222")
+
+async def test_concurrent_consumes_succeed_once(store, session_factory):
+    await issue(store, session_factory, "123456")
+
+    results = await asyncio.gather(*(consume(store, session_factory, "123456") for _ in range(8)))
+
+    assert results.count(True) == 1
+
+async def test_expired_code_is_rejected(session_factory):
+    store = DatabaseOTPStore()
+    await issue(store, session_factory, "123456")
+    async with session_factory() as db:
+        await db.execute(update(OTPCode).values(expires_at=datetime.utcnow() - timedelta(seconds=1)))
+        await db.commit()
+
+    assert not await consume(store, session_factory, "123456")
+
+async def test_only_digests_are_stored(session_factory):
+    await issue(DatabaseOTPStore(), session_factory, "123456")
+    async with session_factory() as db:
+        stored = (await db.execute(select(OTPCode.code_hash))).scalar_one()
+
+    assert "123456" not in stored
+
+async def test_database_consume_is_a_single_update(session_factory):
+    store = DatabaseOTPStore()
+    await issue(store, session_factory, "123456")
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement.lstrip().split()[0].upper())
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        assert await consume(store, session_factory, "123456")
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    assert statements == ["UPDATE"]
+
+@pytest.mark.parametrize("backend, store_class", [
+    ("database", DatabaseOTPStore), ("memory", MemoryOTPStore), ("redis", RedisOTPStore)
+])
+def test_backend_is_chosen_by_setting(backend, store_class, monkeypatch):
+    monkeypatch.setattr(settings, "OTP_STORE_BACKEND", backend)
+
+    assert isinstance(create_otp_store(), store_class)
+
+def test_unknown_backend_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "OTP_STORE_BACKEND", "memcached")
+
+    with pytest.raises(ValueError):
+        create_otp_store()
@@ -0,0 +1,83 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.core.config import settings
+from app.core.rate_limit import MemoryRateLimiter
+from app.middleware.rate_limit import RateLimitMiddleware, RateLimitRule
+
+pytestmark = pytest.mark.anyio
+
+LOGIN_RULES = [RateLimitRule("ip", 4, 60), RateLimitRule("username", 2, 60)]
+
+PROXY_IP = "172.28.0.10"
+
+def make_client(monkeypatch, peer: str) -> TestClient:
+    import app.middleware.rate_limit as rate_limit_module
+    monkeypatch.setitem(rate_limit_module.ROUTE_RULES, ("POST", "/api/auth/login"), LOGIN_RULES)
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUST_PROXY", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_TRUSTED_PROXIES", f"127.0.0.1,{PROXY_IP}")
+
+    api = FastAPI()
+
+    @api.post("/api/auth/login")
+    async def login(body: dict):
+        return {"username": body.get("username")}
+
+    api.add_middleware(RateLimitMiddleware, limiter=MemoryRateLimiter())
+
+    async def from_peer(scope, receive, send):
+        # TestClient always reports "testclient" as the peer
+        await api({**scope, "client": (peer, 40000)}, receive, send)
+
+    return TestClient(from_peer)
+
+@pytest.fixture
+def client(monkeypatch):
+    # Requests arrive through the trusted proxy, which sets X-Real-IP
+    return make_client(monkeypatch, PROXY_IP)
+
+def login(client, username, ip="10.0.0.1"):
+    return client.post("/api/auth/login", json={"username": username}, headers={"X-Real-IP": ip})
+
+async def test_memory_limiter_refills_over_the_window():
+    limiter = MemoryRateLimiter()
+
+    assert await limiter.hit("k", 2, 60) == 0
+    assert await limiter.hit("k", 2, 60) == 0
+    retry_after = await limiter.hit("k", 2, 60)
+
+    # One token comes back every window / limit seconds
+    assert 0 < retry_after <= 30
+
+def test_username_limit_returns_429_with_retry_after(client):
+    assert login(client, "alice").status_code == 200
+    assert login(client, "alice").status_code == 200
+
+    response = login(client, "alice")
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+def test_username_limit_applies_across_ips(client):
+    login(client, "alice", ip="10.0.0.1")
+    login(client, "alice", ip="10.0.0.2")
+
+    assert login(client, "Alice ", ip="10.0.0.3").status_code == 429
+    assert login(client, "bob", ip="10.0.0.3").status_code == 200
+
+def test_ip_limit_applies_across_usernames(client):
+    for username in ("a", "b", "c", "d"):
+        assert login(client, username).status_code == 200
+
+    assert login(client, "e").status_code == 429
+    assert login(client, "e", ip="10.0.0.9").status_code == 200
+
+def test_body_is_replayed_to_the_endpoint(client):
+    assert login(client, "carol").json() == {"username": "carol"}
+
+def test_forwarding_headers_from_untrusted_peers_are_ignored(monkeypatch):
+    direct = make_client(monkeypatch, "203.0.113.7")
+
+    # A fresh spoofed X-Real-IP per request still lands in the peer's own bucket
+    for n in range(4):
+        assert login(direct, f"user{n}", ip=f"10.0.1.{n}").status_code == 200
+    assert login(direct, "user9", ip="10.0.1.9").status_code == 429
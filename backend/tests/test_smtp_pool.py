@@ -0,0 +1,95 @@
+import asyncio
+import socket
+from email.message import EmailMessage
+import pytest
+from aiosmtpd.controller import Controller
+from app.core.config import settings
+from app.services.email import EmailService
+from app.services.smtp_pool import SMTPConnectionPool
+
+pytestmark = pytest.mark.anyio
+
+class RecordingHandler:
+    """Accepts mail, optionally answering the first ``fail_first`` DATA commands with 451."""
+
+    def __init__(self, fail_first: int = 0):
+        self.fail_first = fail_first
+        self.attempts = 0
+        self.sessions = set()
+        self.delivered = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.attempts += 1
+        self.sessions.add(id(session))
+        if self.attempts <= self.fail_first:
+            return "451 Try again later"
+        self.delivered.append(envelope)
+        return "250 OK"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+@pytest.fixture
+def smtp_server():
+    servers = []
+
+    def start(handler: RecordingHandler) -> Controller:
+        controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+        controller.start()
+        servers.append(controller)
+        return controller
+
+    yield start
+    for controller in servers:
+        controller.stop()
+
+def make_message(n: int) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@example.com"
+    message["To"] = f"user{n}@example.com"
+    message["Subject"] = f"Message {n}"
+    message.set_content("hello")
+    return message
+
+async def test_pool_reuses_its_connections(smtp_server):
+    handler = RecordingHandler()
+    controller = smtp_server(handler)
+    pool = SMTPConnectionPool(
+        host=controller.hostname, port=controller.port, username="", password="",
+        size=2, use_starttls=False
+    )
+
+    try:
+        await asyncio.gather(*(pool.send_message(make_message(n)) for n in range(7)))
+    finally:
+        await pool.close()
+
+    assert len(handler.delivered) == 7
+    assert len(handler.sessions) == 2
+
+async def test_background_delivery_retries_until_the_server_accepts(smtp_server, monkeypatch):
+    # The pooled send and the smtplib fallback of the first attempt are both refused
+    handler = RecordingHandler(fail_first=2)
+    controller = smtp_server(handler)
+    monkeypatch.setattr(settings, "DEVELOPMENT_MODE", False)
+    monkeypatch.setattr(settings, "SMTP_HOST", controller.hostname)
+    monkeypatch.setattr(settings, "SMTP_PORT", controller.port)
+    monkeypatch.setattr(settings, "SMTP_PASSWORD", "")
+    monkeypatch.setattr(settings, "SMTP_USE_STARTTLS", False)
+    monkeypatch.setattr(settings, "EMAIL_RETRY_BACKOFF_SECONDS", 0)
+    service = EmailService()
+
+    await service.start()
+    try:
+        assert await service.send_email("user@example.com", "Hello", "<p>hi</p>", "hi")
+        for _ in range(100):
+            if handler.delivered:
+                break
+            await asyncio.sleep(0.02)
+    finally:
+        await service.stop()
+
+    assert handler.attempts == 3
+    assert [envelope.rcpt_tos for envelope in handler.delivered] == [["user@example.com"]]
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from sqlalchemy import text
+from app.core.database import engine
+from app.models.user import User
+from app.services.user_cache import user_cache
+from app.utils.auth import get_password_hash
+
+@pytest.fixture
+def cache_enabled(monkeypatch):
+    monkeypatch.setattr(user_cache, "ttl", 30)
+    yield
+    asyncio.run(user_cache.invalidate("admin@example.com"))
+
+def test_snapshot_leaves_out_the_password_hash():
+    user = User(id=1, username="bob", email="bob@example.com", hashed_password="secret-hash")
+
+    assert "hashed_password" not in user_cache._snapshot(user)
+
+def test_change_password_checks_the_stored_hash_not_a_cached_one(client, admin_headers, cache_enabled):
+    assert client.get("/api/auth/me", headers=admin_headers).status_code == 200
+
+    # Another worker changes the password while this one still has the user cached
+    with engine.begin() as conn:
+        conn.execute(
+            text("UPDATE users SET hashed_password = :password WHERE username = 'admin'"),
+            {"password": get_password_hash("rotated-password")}
+        )
+    assert client.get("/api/auth/me", headers=admin_headers).status_code == 200
+
+    stale = client.post(
+        "/api/users/change-password",
+        headers=admin_headers,
+        json={"current_password": "password123", "new_password": "another-password"}
+    )
+    current = client.post(
+        "/api/users/change-password",
+        headers=admin_headers,
+        json={"current_password": "rotated-password", "new_password": "another-password"}
+    )
+
+    assert stale.status_code == 400
+    assert current.status_code == 200